@@ -0,0 +1,190 @@
+# === Barridos 2D de earth_similarity (mapas de calor radius × teq, insol × st_teff, …) ===
+#
+# En vez de llamar a definir_variables celda a celda, el sistema difuso de logicaDifusa se
+# "compila" una vez a arrays (universos, membresías, árbol de cada regla) y se evalúa para todas
+# las celdas a la vez con NumPy, siguiendo los mismos pasos que skfuzzy:
+#   1. membresía de cada término = interpolación lineal sobre su universo (entradas recortadas a él)
+#   2. disparo de cada regla: AND = mínimo, OR = máximo, NOT = 1 - x
+#   3. corte de cada término de salida = máximo de los disparos de sus reglas
+#   4. salida agregada = máx_t min(corte_t, mf_t) y centroide exacto del polilínea resultante
+# Igual que ControlSystemSimulation, se ignora `regla.weight` (skfuzzy sólo pondera el consecuente).
+# La única diferencia con el motor exacto es que skfuzzy añade al universo de salida los puntos donde
+# cada mf cruza su corte; aquí se usa el universo tal cual (paso 0.1), con error medido < 0.01.
+import base64
+import threading
+import time
+
+import numpy as np
+
+from logicaDifusa import DEFAULTS, ENTRADAS, compilar_antecedente, evaluar_antecedente, obtener_sistema
+
+MAX_PASOS = 400     # por eje → como mucho 160 000 celdas por petición
+BLOQUE = 4096       # celdas por bloque al agregar la salida (bloque × 1001 puntos en float32)
+
+
+class SistemaVectorizado:
+    """Sistema difuso de logicaDifusa listo para evaluarse sobre lotes (n, 7) en orden ENTRADAS."""
+
+    def __init__(self):
+        variables, sistema = obtener_sistema()
+        terminos = {}
+        self.reglas = []          # (árbol del antecedente, término de salida, peso del consecuente)
+        salida = None
+        for regla in sistema.rules:
+            arbol = compilar_antecedente(regla.antecedent, terminos)
+            for c in regla.consequent:
+                salida = c.term.parent
+                self.reglas.append((arbol, c.term.label, float(c.weight)))
+
+        self.terminos = list(terminos)
+        self.columna = [ENTRADAS.index(var) for var, _ in self.terminos]
+        self.universos = [variables[var].universe.astype(float) for var, _ in self.terminos]
+        self.mfs = [variables[var][label].mf.astype(float) for var, label in self.terminos]
+        self.lo = np.array([variables[k].universe.min() for k in ENTRADAS], dtype=float)
+        self.hi = np.array([variables[k].universe.max() for k in ENTRADAS], dtype=float)
+
+        self.universo_salida = salida.universe.astype(float)
+        self.etiquetas_salida = [label for label in salida.terms
+                                 if any(r[1] == label for r in self.reglas)]
+        self.mf_salida = np.stack([salida[label].mf for label in self.etiquetas_salida]).astype(np.float32)
+
+        # Centroide del polilínea (misma hipótesis lineal por tramo que skfuzzy.centroid) como dos
+        # productos matriz-vector: área = Σ y_j·a_j y momento = Σ y_j·m_j con pesos por punto j
+        u = self.universo_salida
+        dx = np.diff(u)
+        self.peso_area = np.zeros(len(u))
+        self.peso_area[:-1] += dx / 2
+        self.peso_area[1:] += dx / 2
+        self.peso_momento = np.zeros(len(u))
+        self.peso_momento[:-1] += dx * (2 * u[:-1] + u[1:]) / 6
+        self.peso_momento[1:] += dx * (u[:-1] + 2 * u[1:]) / 6
+        self.peso_area = self.peso_area.astype(np.float32)
+        self.peso_momento = self.peso_momento.astype(np.float32)
+
+    def grados(self, X):
+        """Membresía de cada término usado en las reglas → lista de arrays (n,)."""
+        X = np.clip(X, self.lo, self.hi)    # clip_to_bounds=True, como la simulación
+        return [np.interp(X[:, j], u, mf) for j, u, mf in zip(self.columna, self.universos, self.mfs)]
+
+    def cortes(self, X):
+        """Nivel de activación de cada término de salida → (n, n_terminos_salida)."""
+        g = self.grados(X)
+        cortes = np.zeros((X.shape[0], len(self.etiquetas_salida)))
+        for arbol, label, peso in self.reglas:
+            k = self.etiquetas_salida.index(label)
+            np.fmax(cortes[:, k], evaluar_antecedente(arbol, g) * peso, out=cortes[:, k])
+        return cortes
+
+    def puntuar(self, X):
+        """X (n, 7) → score (n,) en 0..100; NaN donde ninguna regla se activa (el motor exacto falla)."""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        cortes = self.cortes(X)
+        n = X.shape[0]
+        out = np.empty(n)
+        for i in range(0, n, BLOQUE):
+            c = cortes[i:i + BLOQUE].astype(np.float32)
+            agregada = np.zeros((c.shape[0], self.mf_salida.shape[1]), dtype=np.float32)
+            tmp = np.empty_like(agregada)
+            for k in range(c.shape[1]):
+                np.minimum(c[:, k, None], self.mf_salida[k], out=tmp)
+                np.maximum(agregada, tmp, out=agregada)
+            area = agregada @ self.peso_area
+            momento = agregada @ self.peso_momento
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[i:i + BLOQUE] = np.where(area > 0, momento / area, np.nan)
+        return out
+
+
+_SISTEMA = None
+_LOCK_SISTEMA = threading.Lock()   # propio: SistemaVectorizado llama a obtener_sistema (con su lock)
+
+
+def obtener_sistema_vectorizado():
+    """Sistema vectorizado compartido del proceso (se compila una sola vez aunque lleguen peticiones a la vez)."""
+    global _SISTEMA
+    if _SISTEMA is None:
+        with _LOCK_SISTEMA:
+            if _SISTEMA is None:
+                _SISTEMA = SistemaVectorizado()
+    return _SISTEMA
+
+
+def _eje(spec):
+    """{"variable", "min", "max", "pasos"} → (variable, valores)."""
+    variable = spec["variable"]
+    if variable not in ENTRADAS:
+        raise ValueError(f"Variable desconocida: {variable} (usa una de {', '.join(ENTRADAS)})")
+    pasos = int(spec.get("pasos", 100))
+    if not 2 <= pasos <= MAX_PASOS:
+        raise ValueError(f"pasos debe estar entre 2 y {MAX_PASOS}")
+    lo, hi = float(spec["min"]), float(spec["max"])
+    if not lo < hi:
+        raise ValueError("min debe ser menor que max")
+    return variable, np.linspace(lo, hi, pasos)
+
+
+def barrer(base, eje_x, eje_y):
+    """
+    Mapa de earth_similarity variando dos entradas con el resto fijo en `base`
+    (las que falten toman los mismos defaults que definir_variables).
+
+    Devuelve (malla float32 de forma (pasos_y, pasos_x) — fila = valor de y —, valores_x, valores_y).
+    """
+    var_x, xs = _eje(eje_x)
+    var_y, ys = _eje(eje_y)
+    if var_x == var_y:
+        raise ValueError("Los dos ejes deben variar entradas distintas")
+
+    fila = np.array([float(base.get(k, DEFAULTS[k])) for k in ENTRADAS])
+    X = np.tile(fila, (len(xs) * len(ys), 1))
+    mx, my = np.meshgrid(xs, ys)
+    X[:, ENTRADAS.index(var_x)] = mx.ravel()
+    X[:, ENTRADAS.index(var_y)] = my.ravel()
+
+    malla = obtener_sistema_vectorizado().puntuar(X).astype(np.float32).reshape(len(ys), len(xs))
+    return malla, xs, ys
+
+
+def carga_util(malla, xs, ys, eje_x, eje_y, formato="base64"):
+    """Respuesta JSON compacta: matriz float32 little-endian en base64 (NaN = sin reglas activas)."""
+    resp = {
+        "x": {"variable": eje_x["variable"], "min": float(xs[0]), "max": float(xs[-1]), "pasos": len(xs)},
+        "y": {"variable": eje_y["variable"], "min": float(ys[0]), "max": float(ys[-1]), "pasos": len(ys)},
+        "forma": list(malla.shape),
+        "sin_reglas": int(np.isnan(malla).sum()),
+    }
+    if formato == "json":
+        resp["datos"] = [[None if np.isnan(v) else round(float(v), 2) for v in fila] for fila in malla]
+    else:
+        resp["dtype"] = "float32<"
+        resp["datos"] = base64.b64encode(malla.astype("<f4").tobytes()).decode("ascii")
+    return resp
+
+
+def comparar_exacto(n=300, seed=0):
+    """Error máximo frente a definir_variables en n entradas aleatorias (muestreo del surrogado)."""
+    from surrogado_difuso import muestrear, puntuar_exacto
+
+    X = muestrear(n, seed=seed)
+    t = time.perf_counter()
+    exacto = puntuar_exacto(X)
+    t_exacto = time.perf_counter() - t
+    t = time.perf_counter()
+    vect = obtener_sistema_vectorizado().puntuar(X)
+    t_vect = time.perf_counter() - t
+    ambos = ~np.isnan(exacto) & ~np.isnan(vect)
+    return {
+        "n": n,
+        "error_max": float(np.abs(exacto[ambos] - vect[ambos]).max()),
+        "nan_coinciden": bool(np.array_equal(np.isnan(exacto), np.isnan(vect))),
+        "exacto_s": round(t_exacto, 3),
+        "vectorizado_s": round(t_vect, 4),
+    }
+
+
+if __name__ == "__main__":
+    print(comparar_exacto())
+    t = time.perf_counter()
+    malla, _, _ = barrer({}, {"variable": "radius", "min": 0.3, "max": 4, "pasos": 200},
+                         {"variable": "teq", "min": 150, "max": 500, "pasos": 200})
+    print(f"Barrido 200×200: {time.perf_counter() - t:.2f} s | máx {np.nanmax(malla):.1f}")
@@ -0,0 +1,264 @@
+# === Benchmark de las rutas de inferencia del modelo (carga, memoria, latencia, probabilidades) ===
+#
+#   python benchmark_inferencia.py                       # todas las rutas, 1 / 100 / 10k / 1M filas
+#   python benchmark_inferencia.py --tamanos 1 100 10000 --json bench.json
+#   python benchmark_inferencia.py --referencia bench_anterior.json   # sale con código 1 si hay regresión
+#
+# Rutas medidas (cada una en un proceso nuevo, para que tiempo de carga y RSS no se contaminen):
+#   app_pickle         pickle.load + predict, como app.py
+#   joblib_proba       joblib.load + predict_proba, como modelo_api.py
+#   joblib_predict     joblib.load + predict (la alternativa cuando no hay predict_proba)
+#   booster_nativo     xgb.Booster(model_file=...) + inplace_predict sobre un .ubj exportado
+#   evaluador_numpy    EvaluadorNumpy (modelo_numpy.npz, sin xgboost)
+# Todas reciben las columnas en el orden de FEATURES (app.py usa otro orden; aquí se usa el del
+# modelo para que las probabilidades sean comparables).
+import argparse
+import json
+import multiprocessing as mp
+import os
+import pickle
+import platform
+import queue
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from catalogo import FEATURES, cargar_catalogo
+from evaluador_numpy import MODEL_PATH, exportar
+
+TAMANOS = (1, 100, 10_000, 1_000_000)
+RUTAS = ("app_pickle", "joblib_proba", "joblib_predict", "booster_nativo", "evaluador_numpy")
+N_COMPARAR = 10_000            # filas sobre las que se comparan probabilidades
+REFERENCIA = "joblib_proba"    # ruta contra la que se comparan las probabilidades (la de modelo_api.py)
+TOLERANCIA = {"evaluador_numpy": 1e-5}   # el resto debe coincidir bit a bit con REFERENCIA
+FACTOR_REGRESION = 1.25        # más lento que la referencia por encima de este factor → regresión
+TIMEOUT_RUTA = 1800            # s por ruta; un hijo que muere (segfault, OOM) no cuelga el benchmark
+
+
+def _rss_mb():
+    """RSS actual del proceso en MB (Linux: /proc; en otros sistemas, el pico de getrusage)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / 1e6 if sys.platform == "darwin" else pico / 1e3
+
+
+def _cargar(ruta, artefactos):
+    """Carga el artefacto de la ruta → función X → probabilidades (n, 2)."""
+    if ruta == "app_pickle":
+        with open(artefactos["pkl"], "rb") as f:
+            model = pickle.load(f)
+        return model.predict_proba, model.predict
+    if ruta in ("joblib_proba", "joblib_predict"):
+        import joblib
+        model = joblib.load(artefactos["pkl"])
+        if ruta == "joblib_proba":
+            return model.predict_proba, model.predict_proba
+        return model.predict_proba, model.predict
+    if ruta == "booster_nativo":
+        import xgboost as xgb
+        booster = xgb.Booster(model_file=artefactos["ubj"])
+
+        def proba(X):
+            p1 = booster.inplace_predict(X)
+            return np.column_stack([1.0 - p1, p1])
+        return proba, proba
+    if ruta == "evaluador_numpy":
+        from evaluador_numpy import EvaluadorNumpy
+        ev = EvaluadorNumpy.cargar(artefactos["npz"])
+        return ev.predict_proba, ev.predict_proba
+    raise ValueError(f"Ruta desconocida: {ruta}")
+
+
+def _repeticiones(n):
+    return 200 if n <= 1 else 50 if n <= 100 else 5 if n <= 10_000 else 1
+
+
+def _medir(ruta, artefactos, datos_path, tamanos, cola):
+    """Proceso hijo: carga, mide y devuelve resultados + probabilidades de comparación por la cola."""
+    try:
+        base = np.load(datos_path, mmap_mode="r")
+        import_rss = _rss_mb()
+        t = time.perf_counter()
+        proba, inferir = _cargar(ruta, artefactos)
+        carga_s = time.perf_counter() - t
+        rss = _rss_mb()
+
+        latencias = {}
+        for n in tamanos:
+            X = np.ascontiguousarray(base[:n])
+            inferir(X)   # calentamiento
+            tiempos = []
+            for _ in range(_repeticiones(n)):
+                t = time.perf_counter()
+                inferir(X)
+                tiempos.append(time.perf_counter() - t)
+            tiempos = np.array(tiempos) * 1000.0
+            latencias[str(n)] = {
+                "mediana_ms": round(float(np.median(tiempos)), 4),
+                "p95_ms": round(float(np.percentile(tiempos, 95)), 4),
+                "filas_s": round(n / (np.median(tiempos) / 1000.0), 1),
+            }
+        p = np.asarray(proba(np.ascontiguousarray(base[:N_COMPARAR])), dtype=np.float64)
+        cola.put({
+            "ruta": ruta,
+            "carga_s": round(carga_s, 4),
+            "rss_base_mb": round(import_rss, 1),
+            "rss_tras_carga_mb": round(rss, 1),
+            "rss_pico_mb": round(_rss_mb(), 1),
+            "latencias": latencias,
+            "_proba": p,
+        })
+    except Exception as e:   # se informa en el reporte en vez de tumbar el resto de rutas
+        cola.put({"ruta": ruta, "error": f"{type(e).__name__}: {e}"})
+
+
+def _esperar(proc, cola, timeout):
+    """Resultado del hijo; si muere sin responder (segfault, OOM) o pasa `timeout`, un dict de error."""
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            return cola.get(timeout=1.0)
+        except queue.Empty:
+            if not proc.is_alive():
+                try:   # pudo dejar el resultado justo antes de salir
+                    return cola.get(timeout=1.0)
+                except queue.Empty:
+                    return {"error": f"el proceso terminó con código {proc.exitcode} sin resultados"}
+    proc.kill()
+    return {"error": f"sin respuesta en {timeout} s"}
+
+
+def preparar_artefactos(destino, model_path=MODEL_PATH):
+    """Exporta .ubj (booster nativo) y .npz del evaluador desde el model.pkl medido, en `destino`."""
+    import joblib
+    model = joblib.load(model_path)
+    ubj = os.path.join(destino, "modelo.ubj")
+    model.get_booster().save_model(ubj)
+    npz = exportar(model, os.path.join(destino, "modelo_numpy.npz"))
+    return {"pkl": model_path, "ubj": ubj, "npz": npz}
+
+
+def preparar_datos(destino, n, seed=0):
+    """Filas del catálogo (remuestreadas hasta n) en float32 y orden FEATURES → .npy."""
+    base = cargar_catalogo()[FEATURES].to_numpy(dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    path = os.path.join(destino, "filas.npy")
+    np.save(path, base[rng.integers(0, len(base), size=n)])
+    return path
+
+
+def ejecutar(rutas=RUTAS, tamanos=TAMANOS, model_path=MODEL_PATH, seed=0, timeout=TIMEOUT_RUTA):
+    ctx = mp.get_context("spawn")
+    resultados = []
+    # La referencia se mide primero aunque no se haya pedido, para comparar siempre contra ella
+    orden = [REFERENCIA] + [r for r in rutas if r != REFERENCIA]
+    with tempfile.TemporaryDirectory() as tmp:
+        artefactos = preparar_artefactos(tmp, model_path)
+        datos = preparar_datos(tmp, max(max(tamanos), N_COMPARAR), seed)
+        referencia = None
+        for ruta in orden:
+            cola = ctx.Queue()
+            proc = ctx.Process(target=_medir, args=(ruta, artefactos, datos, tamanos, cola))
+            proc.start()
+            r = _esperar(proc, cola, timeout)
+            r["ruta"] = ruta
+            proc.join()
+            p = r.pop("_proba", None)
+            if ruta == REFERENCIA:
+                referencia = p
+            if p is not None:
+                if referencia is None:
+                    r["error_max_vs_referencia"] = None
+                    r["probabilidades_ok"] = False
+                else:
+                    err = float(np.abs(p - referencia).max())
+                    r["error_max_vs_referencia"] = err
+                    r["probabilidades_ok"] = err <= TOLERANCIA.get(ruta, 0.0)
+            if ruta in rutas:
+                resultados.append(r)
+                _imprimir(r)
+
+    import xgboost
+    return {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "maquina": {"plataforma": platform.platform(), "cpus": os.cpu_count(),
+                    "python": platform.python_version(), "numpy": np.__version__,
+                    "xgboost": xgboost.__version__},
+        "referencia_probabilidades": REFERENCIA,
+        "tamanos": list(tamanos),
+        "rutas": resultados,
+    }
+
+
+def _imprimir(r):
+    if "error" in r:
+        print(f"{r['ruta']:<16} ERROR {r['error']}")
+        return
+    lat = " | ".join(f"{n}: {v['mediana_ms']:.3f} ms" for n, v in r["latencias"].items())
+    if r["error_max_vs_referencia"] is None:
+        estado = f"sin referencia ({REFERENCIA} falló)"
+    else:
+        estado = f"{'ok' if r['probabilidades_ok'] else 'DIFIERE'} ({r['error_max_vs_referencia']:.1e})"
+    print(f"{r['ruta']:<16} carga {r['carga_s']:.3f} s | RSS {r['rss_tras_carga_mb']:.0f} MB | {lat} | "
+          f"proba {estado}")
+
+
+def regresiones(reporte, referencia, factor=FACTOR_REGRESION):
+    """Compara con un reporte anterior → lista de textos describiendo cada regresión."""
+    previas = {r["ruta"]: r for r in referencia.get("rutas", []) if "error" not in r}
+    avisos = []
+    for r in reporte["rutas"]:
+        if "error" in r:
+            avisos.append(f"{r['ruta']}: falló ({r['error']})")
+            continue
+        if not r["probabilidades_ok"]:
+            err = r["error_max_vs_referencia"]
+            avisos.append(f"{r['ruta']}: probabilidades distintas ({'sin referencia' if err is None else f'{err:.1e}'})")
+        prev = previas.get(r["ruta"])
+        if prev is None:
+            continue
+        if r["carga_s"] > prev["carga_s"] * factor:
+            avisos.append(f"{r['ruta']}: carga {prev['carga_s']:.3f} → {r['carga_s']:.3f} s")
+        for n, v in r["latencias"].items():
+            antes = prev["latencias"].get(n)
+            if antes and v["mediana_ms"] > antes["mediana_ms"] * factor:
+                avisos.append(f"{r['ruta']} [{n} filas]: {antes['mediana_ms']:.3f} → {v['mediana_ms']:.3f} ms")
+    return avisos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de las rutas de inferencia del modelo.")
+    parser.add_argument("--rutas", nargs="+", choices=RUTAS, default=list(RUTAS))
+    parser.add_argument("--tamanos", nargs="+", type=int, default=list(TAMANOS))
+    parser.add_argument("--modelo", default=MODEL_PATH)
+    parser.add_argument("--json", default=None, help="ruta del reporte JSON")
+    parser.add_argument("--referencia", default=None, help="reporte anterior con el que comparar")
+    parser.add_argument("--factor", type=float, default=FACTOR_REGRESION)
+    parser.add_argument("--timeout", type=int, default=TIMEOUT_RUTA, help="segundos máximos por ruta")
+    args = parser.parse_args(argv)
+
+    reporte = ejecutar(args.rutas, args.tamanos, args.modelo, timeout=args.timeout)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+        print(f"Reporte: {args.json}")
+
+    fallos = [r for r in reporte["rutas"] if "error" in r or not r["probabilidades_ok"]]
+    if args.referencia:
+        with open(args.referencia, "r", encoding="utf-8") as f:
+            avisos = regresiones(reporte, json.load(f), args.factor)
+        for a in avisos:
+            print(f"[REGRESIÓN] {a}")
+        if avisos:
+            return 1
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
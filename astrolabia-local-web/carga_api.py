@@ -0,0 +1,229 @@
+# === Generador de carga para la API de predicción (throughput, percentiles de latencia, errores) ===
+#
+#   python carga_api.py --url http://localhost:5000 --endpoint /predict --concurrencia 8 --duracion 30
+#   python carga_api.py --endpoint /score --tasa 200 --json resultados.json
+#
+# Reproduce vectores de features reales muestreados de exoplanetas_unificado.csv. Con --tasa
+# las peticiones se lanzan a ritmo fijo (bucle abierto: la latencia incluye la espera en cola);
+# sin ella cada worker encadena peticiones lo más rápido posible (bucle cerrado).
+# El throughput son las respuestas completadas dentro de la ventana medida; lo que tarda en
+# vaciarse la cola al terminar se informa aparte (drenaje_s). En bucle abierto el pool de hilos
+# se dimensiona con la tasa (EN_VUELO_S segundos de peticiones en vuelo) para que la cola se forme
+# en el servidor y no en el cliente; si aun así se llena, se avisa.
+# Sólo usa la biblioteca estándar + pandas/numpy para leer el CSV.
+import argparse
+import json
+import math
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from catalogo import FEATURES, cargar_catalogo
+
+EN_VUELO_S = 2.0    # bucle abierto: hilos = tasa × EN_VUELO_S (como mínimo --concurrencia)
+MAX_HILOS = 1024
+
+# Entradas del sistema difuso ← columnas del CSV (igual que calcularSimilitud.py)
+MAP_DIFUSO = {
+    "radius":  "pl_radio",
+    "teq":     "pl_temperatura_eq",
+    "insol":   "insolacion",
+    "period":  "periodo_orbital",
+    "st_teff": "st_temperatura",
+    "st_rad":  "st_radio",
+    "st_logg": "st_gravedad",
+}
+
+
+def cuerpos(endpoint, n, seed=0):
+    """n cuerpos JSON muestreados del catálogo con el formato que espera cada endpoint."""
+    df = cargar_catalogo()
+    rng = np.random.default_rng(seed)
+    filas = df.iloc[rng.integers(0, len(df), size=n)]
+
+    def limpio(v):
+        return None if v is None or (isinstance(v, float) and np.isnan(v)) else float(v)
+
+    out = []
+    for _, row in filas.iterrows():
+        if endpoint.startswith("/score"):
+            body = {k: limpio(row[col]) for k, col in MAP_DIFUSO.items()}
+            body = {k: v for k, v in body.items() if v is not None}
+        else:
+            # /predict usa 0 para las features ausentes (igual que prediccion.html)
+            body = {f: (limpio(row[f]) or 0.0) for f in FEATURES}
+        out.append(json.dumps(body).encode("utf-8"))
+    return out
+
+
+def _peticion(url, body, timeout):
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            ok = 200 <= resp.status < 300
+    except urllib.error.HTTPError as e:
+        e.read()
+        ok = False
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - t0, ok
+
+
+def ejecutar(url, bodies, concurrencia=4, duracion=10.0, tasa=None, timeout=30.0, calentamiento=1.0):
+    """
+    Lanza peticiones durante `duracion` s (tras `calentamiento` s que no se miden).
+    Devuelve dict con throughput, percentiles de latencia (ms) y tasa de error.
+    """
+    latencias, errores, completadas = [], 0, 0
+    en_vuelo = pool_lleno = 0
+    lock = threading.Lock()
+    contador = iter(range(10 ** 12))
+    hilos = concurrencia
+    if tasa:
+        hilos = max(concurrencia, min(MAX_HILOS, math.ceil(tasa * EN_VUELO_S)))
+    inicio = time.perf_counter()
+    medir_desde = inicio + calentamiento
+    fin = medir_desde + duracion
+
+    def registrar(t_envio, lat, ok):
+        nonlocal errores, completadas
+        t_fin = time.perf_counter()
+        with lock:
+            if medir_desde <= t_fin < fin:
+                completadas += 1
+            if t_envio < medir_desde:
+                return
+            latencias.append(lat)
+            if not ok:
+                errores += 1
+
+    def cerrado():
+        while True:
+            t = time.perf_counter()
+            if t >= fin:
+                return
+            lat, ok = _peticion(url, bodies[next(contador) % len(bodies)], timeout)
+            registrar(t, lat, ok)
+
+    def abierto(pool):
+        nonlocal en_vuelo, pool_lleno
+        intervalo = 1.0 / tasa
+        programada = inicio
+        while programada < fin:
+            espera = programada - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            body = bodies[next(contador) % len(bodies)]
+
+            def tarea(t_prog=programada, body=body):
+                nonlocal en_vuelo
+                try:
+                    lat, ok = _peticion(url, body, timeout)
+                    # latencia desde el instante programado: incluye la cola si el servidor no da abasto
+                    registrar(t_prog, time.perf_counter() - t_prog, ok)
+                finally:
+                    with lock:
+                        en_vuelo -= 1
+            with lock:
+                if en_vuelo >= hilos and programada >= medir_desde:
+                    pool_lleno += 1     # esta petición esperará en la cola del cliente
+                en_vuelo += 1
+            pool.submit(tarea)
+            programada += intervalo
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        if tasa:
+            abierto(pool)
+        else:
+            for _ in range(concurrencia):
+                pool.submit(cerrado)
+        t_envios = time.perf_counter()
+    drenaje = max(time.perf_counter() - max(t_envios, fin), 0.0)
+
+    lat = np.array(latencias) * 1000.0
+    n = len(lat)
+    pct = {f"p{p}": round(float(np.percentile(lat, p)), 3) if n else None for p in (50, 90, 95, 99)}
+    return {
+        "url": url,
+        "modo": "tasa_fija" if tasa else "bucle_cerrado",
+        "concurrencia": concurrencia,
+        "hilos": hilos,
+        "tasa_objetivo": tasa,
+        "duracion_s": round(duracion, 3),
+        "drenaje_s": round(drenaje, 3),
+        "peticiones": n,
+        "completadas_en_ventana": completadas,
+        "pool_lleno": pool_lleno,
+        "errores": errores,
+        "tasa_error": round(errores / n, 5) if n else None,
+        "throughput_rps": round(completadas / duracion, 2),
+        "latencia_ms": dict(
+            media=round(float(lat.mean()), 3) if n else None,
+            max=round(float(lat.max()), 3) if n else None,
+            **pct,
+        ),
+    }
+
+
+def tabla(r):
+    lat = r["latencia_ms"]
+    filas = [
+        ("URL", r["url"]),
+        ("Modo", f"{r['modo']} (concurrencia {r['concurrencia']}"
+                 + (f", {r['tasa_objetivo']} req/s, {r['hilos']} hilos)" if r["tasa_objetivo"] else ")")),
+        ("Peticiones", f"{r['peticiones']} en {r['duracion_s']:.1f} s (+{r['drenaje_s']:.1f} s de drenaje)"),
+        ("Throughput", f"{r['throughput_rps']:.1f} req/s"),
+        ("Errores", f"{r['errores']} ({(r['tasa_error'] or 0) * 100:.2f} %)"),
+    ]
+    for k in ("media", "p50", "p90", "p95", "p99", "max"):
+        filas.append((f"Latencia {k}", "—" if lat[k] is None else f"{lat[k]:.2f} ms"))
+    if r["pool_lleno"]:
+        filas.append(("Aviso", f"{r['pool_lleno']} envíos esperaron en el pool del cliente: "
+                               "la latencia incluye cola local (sube --concurrencia)"))
+    ancho = max(len(k) for k, _ in filas)
+    return "\n".join(f"{k:<{ancho}}  {v}" for k, v in filas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API de Astrolab-IA.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--endpoint", action="append",
+                        help="endpoint(s) a probar (repetible). Por defecto /predict")
+    parser.add_argument("--concurrencia", type=int, default=4,
+                        help="workers del bucle cerrado; con --tasa, mínimo de hilos del pool")
+    parser.add_argument("--duracion", type=float, default=10.0, help="segundos medidos")
+    parser.add_argument("--calentamiento", type=float, default=1.0)
+    parser.add_argument("--tasa", type=float, default=None, help="req/s objetivo (bucle abierto)")
+    parser.add_argument("--muestras", type=int, default=2000, help="vectores distintos a reproducir")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--etiqueta", default=None, help="nombre del escenario (modo servidor, formato modelo…)")
+    parser.add_argument("--json", default=None, help="ruta donde guardar los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for endpoint in args.endpoint or ["/predict"]:
+        bodies = cuerpos(endpoint, args.muestras)
+        r = ejecutar(args.url.rstrip("/") + endpoint, bodies, args.concurrencia, args.duracion,
+                     args.tasa, args.timeout, args.calentamiento)
+        r["endpoint"] = endpoint
+        r["etiqueta"] = args.etiqueta
+        r["fecha"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        resultados.append(r)
+        print(tabla(r))
+        print()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"Resultados: {args.json}")
+    return resultados
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# === Carga del catálogo unificado (CSV) + earth_similarity de los JSON puntuados ===
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CSV_PATH = os.path.join(BASE_DIR, "..", "data-treatment", "exoplanetas_unificado.csv")
+# Se usa el primer JSON que exista (el más completo primero)
+JSON_SCORES = [
+    os.path.join(BASE_DIR, "exoplanetas_light_scored_imputed.json"),
+    os.path.join(BASE_DIR, "exoplanetas_light_scored.json"),
+    os.path.join(BASE_DIR, "exoplanetas_light.json"),
+]
+
+# Orden de columnas con el que se entrenó el modelo (mismo que el CSV sin RA/DEC)
+FEATURES = [
+    "periodo_orbital", "duracion_transito", "profundidad", "pl_radio",
+    "insolacion", "st_radio", "st_temperatura", "st_gravedad", "pl_temperatura_eq"
+]
+
+# ========= Normalizar etiquetas (igual que en creacion_modelo.ipynb) =========
+LABEL_MAP_FP = {"FALSE POSITIVE", "FP", "FA", "REFUTED", "REFUTED [PLANET]", "FALSE POSITIVE [CANDIDATE]"}
+LABEL_MAP_CONFIRMED = {"CONFIRMED", "CP", "KP", "KNOWN PLANET"}
+LABEL_MAP_CANDIDATE = {"CANDIDATE", "PC", "APC", "NOT DISPOSITIONED"}
+
+
+def normalize_label(label):
+    label = str(label).strip().upper()
+    if label in LABEL_MAP_FP:
+        return "FALSE POSITIVE"
+    elif label in LABEL_MAP_CONFIRMED:
+        return "CONFIRMED"
+    elif label in LABEL_MAP_CANDIDATE:
+        return "CANDIDATE"
+    else:
+        return "OTHER"
+
+
+def cargar_scores(json_paths=JSON_SCORES):
+    """Devuelve {object_id: earth_similarity} del primer JSON disponible (vacío si no hay)."""
+    for path in json_paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        return {
+            str(r.get("object_id")): r.get("earth_similarity")
+            for r in records
+            if r.get("object_id") is not None
+        }
+    return {}
+
+
+def cargar_catalogo(csv_path=CSV_PATH, json_paths=JSON_SCORES):
+    """
+    Lee el CSV unificado y le añade earth_similarity.
+
+    Devuelve un DataFrame sin object_id duplicados (se conserva la primera fila),
+    con label normalizado a CONFIRMED / CANDIDATE / FALSE POSITIVE / OTHER y
+    las columnas numéricas convertidas a float (NaN si faltan).
+    """
+    df = pd.read_csv(csv_path, low_memory=False)
+    if "object_id" not in df.columns:
+        raise ValueError("El CSV no tiene columna 'object_id' (necesaria para el enlace).")
+
+    df["object_id"] = df["object_id"].astype(str)
+    df = df[~df["object_id"].duplicated(keep="first")].reset_index(drop=True)
+
+    for col in FEATURES + ["RA", "DEC"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce") if col in df.columns else np.nan
+
+    df["label"] = df["label"].map(normalize_label)
+    df["mission"] = df["mission"].astype(str)
+
+    scores = cargar_scores(json_paths)
+    df["earth_similarity"] = pd.to_numeric(df["object_id"].map(scores), errors="coerce")
+    return df
@@ -0,0 +1,151 @@
+# === Catálogo materializado en ficheros .npy de sólo lectura, compartido entre workers vía mmap ===
+#
+#   python catalogo_mmap.py      # materializa catalogo_mmap/ a partir del CSV + JSON puntuado
+#
+# Cada worker abre los mismos ficheros con np.load(mmap_mode="r"): el sistema operativo
+# mantiene una única copia física en la page cache para N procesos.
+#   numericas.npy   float64 (n, k) en orden Fortran → cada columna es contigua
+#   <cat>_codigos.npy  uint8 por fila para label / mission (categorías en meta.json)
+#   ids_bytes.npy   object_id en UTF-8 concatenados (tabla de strings)
+#   ids_offsets.npy int64 (n + 1): el id de la fila i es ids_bytes[off[i]:off[i+1]]
+#   ids_orden.npy   int32: filas ordenadas por object_id → búsqueda binaria sin dicts por proceso
+import json
+import os
+import shutil
+import time
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+from catalogo import BASE_DIR, FEATURES, cargar_catalogo
+
+MMAP_DIR = os.path.join(BASE_DIR, "catalogo_mmap")
+VERSION = 1
+
+NUMERICAS = FEATURES + ["RA", "DEC", "earth_similarity"]
+CATEGORICAS = ["label", "mission"]
+
+
+def materializar(df, destino=MMAP_DIR):
+    """Escribe el catálogo (DataFrame de cargar_catalogo) en `destino` de forma atómica."""
+    tmp = destino + ".tmp"
+    if os.path.isdir(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+
+    np.save(os.path.join(tmp, "numericas.npy"),
+            np.asfortranarray(df[NUMERICAS].to_numpy(dtype=np.float64)))
+
+    categorias = {}
+    for col in CATEGORICAS:
+        cat = pd.Categorical(df[col].astype(str))
+        if len(cat.categories) > 255:
+            raise ValueError(f"Demasiadas categorías en {col} para uint8")
+        categorias[col] = [str(c) for c in cat.categories]
+        np.save(os.path.join(tmp, f"{col}_codigos.npy"), cat.codes.astype(np.uint8))
+
+    ids = [oid.encode("utf-8") for oid in df["object_id"].astype(str)]
+    offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in ids])
+    np.save(os.path.join(tmp, "ids_bytes.npy"), np.frombuffer(b"".join(ids), dtype=np.uint8))
+    np.save(os.path.join(tmp, "ids_offsets.npy"), offsets)
+    np.save(os.path.join(tmp, "ids_orden.npy"),
+            np.array(sorted(range(len(ids)), key=ids.__getitem__), dtype=np.int32))
+
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": VERSION,
+            "generado": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "filas": len(ids),
+            "numericas": NUMERICAS,
+            "categorias": categorias,
+        }, f, ensure_ascii=False, indent=2)
+
+    if os.path.isdir(destino):
+        shutil.rmtree(destino)
+    os.replace(tmp, destino)
+    return destino
+
+
+class CatalogoCompartido:
+    """Vista de sólo lectura sobre catalogo_mmap/ (ningún array se copia al abrirlo)."""
+
+    def __init__(self, directorio=MMAP_DIR):
+        with open(os.path.join(directorio, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != VERSION:
+            raise ValueError("catalogo_mmap/ incompatible: vuelve a generarlo con `python catalogo_mmap.py`")
+
+        def abrir(nombre):
+            return np.load(os.path.join(directorio, nombre), mmap_mode="r")
+
+        self.numericas = abrir("numericas.npy")
+        self.codigos = {col: abrir(f"{col}_codigos.npy") for col in CATEGORICAS}
+        self.ids_bytes = abrir("ids_bytes.npy")
+        self.ids_offsets = abrir("ids_offsets.npy")
+        self.ids_orden = abrir("ids_orden.npy")
+        self._col = {c: j for j, c in enumerate(self.meta["numericas"])}
+
+    @classmethod
+    def cargar(cls, directorio=MMAP_DIR):
+        return cls(directorio)
+
+    def __len__(self):
+        return int(self.meta["filas"])
+
+    def columna(self, nombre):
+        """Columna numérica (vista sobre el mmap) o códigos de una categórica."""
+        if nombre in self._col:
+            return self.numericas[:, self._col[nombre]]
+        return self.codigos[nombre]
+
+    def _id_bytes(self, i):
+        return self.ids_bytes[self.ids_offsets[i]:self.ids_offsets[i + 1]].tobytes()
+
+    def object_id(self, i):
+        return self._id_bytes(i).decode("utf-8")
+
+    def fila_de(self, object_id):
+        """object_id → fila (O(log n) sobre ids_orden); None si no existe."""
+        objetivo = str(object_id).encode("utf-8")
+        pos = bisect_left(range(len(self)), objetivo, key=lambda k: self._id_bytes(self.ids_orden[k]))
+        if pos < len(self) and self._id_bytes(self.ids_orden[pos]) == objetivo:
+            return int(self.ids_orden[pos])
+        return None
+
+    def registro(self, i):
+        """Fila i como dict (NaN → None), igual que los registros de exoplanetas_light.json."""
+        rec = {"object_id": self.object_id(i)}
+        for col in CATEGORICAS:
+            rec[col] = self.meta["categorias"][col][int(self.codigos[col][i])]
+        for col, j in self._col.items():
+            v = float(self.numericas[i, j])
+            rec[col] = None if np.isnan(v) else v
+        return rec
+
+    def dataframe(self):
+        """
+        DataFrame con las columnas de cargar_catalogo(). Qué se comparte entre workers y qué no:
+          - numéricas: vista del mmap (sin copia; una sola copia física para todos los procesos)
+          - label / mission: Categorical → códigos int8 por proceso (n bytes) + la tabla de
+            categorías; ningún str por fila
+          - object_id: str por fila en cada proceso. Rankings indexa por object_id en dicts
+            propios, así que esos str existen por proceso de todas formas; para buscar un id
+            sin ellos está fila_de() sobre la tabla compartida.
+        """
+        df = pd.DataFrame(self.numericas, columns=self.meta["numericas"], copy=False)
+        for col in CATEGORICAS:
+            df[col] = pd.Categorical.from_codes(
+                np.asarray(self.codigos[col], dtype=np.int8), self.meta["categorias"][col]
+            )
+        datos, off = self.ids_bytes.tobytes(), self.ids_offsets
+        df["object_id"] = [datos[off[i]:off[i + 1]].decode("utf-8") for i in range(len(self))]
+        return df
+
+
+if __name__ == "__main__":
+    t0 = time.time()
+    destino = materializar(cargar_catalogo())
+    print(f"✔ Catálogo materializado en {destino}")
+    print(f"⏱ Tiempo total: {time.time() - t0:.1f} s")
@@ -0,0 +1,208 @@
+# === Evaluador de ensembles XGBoost en NumPy puro (sin xgboost ni sklearn en inferencia) ===
+#
+#   python evaluador_numpy.py exportar [model.pkl] [modelo_numpy.npz]
+#   python evaluador_numpy.py benchmark [modelo_numpy.npz] [model.pkl]
+#
+# El exportador aplana todos los árboles en arrays contiguos (feature, umbral, hijo izq/der,
+# valor de hoja, dirección por defecto para NaN). El evaluador recorre todos los árboles para
+# todo el lote a la vez, nivel a nivel: en cada paso cada par (fila, árbol) baja un nivel.
+# Las hojas apuntan a sí mismas, así que basta con iterar `profundidad_max` veces sin máscaras.
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "model.pkl")
+NUMPY_PATH = os.path.join(BASE_DIR, "modelo_numpy.npz")
+
+# Filas por bloque: la matriz (filas x árboles) de nodos activos cabe en caché
+BLOQUE = 4096
+
+
+def _base_scores(texto):
+    """base_score viene como '5E-1' o '[5E-1,5E-1,...]' según la versión de xgboost."""
+    return [float(v) for v in str(texto).strip("[]").split(",") if v.strip()]
+
+
+def exportar(model, path=NUMPY_PATH):
+    """XGBClassifier o Booster → .npz con los árboles aplanados."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    data = json.loads(booster.save_raw("json"))
+    learner = data["learner"]
+    gbm = learner["gradient_booster"]
+    if gbm.get("name") != "gbtree":
+        raise ValueError(f"Booster no soportado: {gbm.get('name')} (sólo gbtree)")
+    trees = gbm["model"]["trees"]
+    tree_info = gbm["model"]["tree_info"]
+
+    feat, thr, left, right, dleft, valor, raices = [], [], [], [], [], [], []
+    profundidad_max = 0
+    offset = 0
+    for t in trees:
+        if any(st != 0 for st in t["split_type"]):
+            raise ValueError("Splits categóricos no soportados")
+        lc = np.asarray(t["left_children"], dtype=np.int64)
+        rc = np.asarray(t["right_children"], dtype=np.int64)
+        n = len(lc)
+        hoja = lc == -1
+        idx = np.arange(n)
+
+        feat.append(np.where(hoja, 0, t["split_indices"]).astype(np.int32))
+        thr.append(np.where(hoja, np.nan, t["split_conditions"]).astype(np.float32))
+        left.append((np.where(hoja, idx, lc) + offset).astype(np.int32))
+        right.append((np.where(hoja, idx, rc) + offset).astype(np.int32))
+        dleft.append(np.asarray(t["default_left"], dtype=bool))
+        valor.append(np.where(hoja, t["split_conditions"], 0.0).astype(np.float32))
+        raices.append(offset)
+
+        # profundidad del árbol (los padres siempre tienen índice menor que los hijos)
+        prof = np.zeros(n, dtype=np.int32)
+        for i in range(n):
+            if not hoja[i]:
+                prof[lc[i]] = prof[rc[i]] = prof[i] + 1
+        profundidad_max = max(profundidad_max, int(prof.max()))
+        offset += n
+
+    objetivo = learner["objective"]["name"]
+    n_clases = max(int(learner["learner_model_param"].get("num_class", "0")), 1)
+    base = np.asarray(_base_scores(learner["learner_model_param"]["base_score"]), dtype=np.float64)
+    if objetivo in ("binary:logistic", "reg:logistic"):
+        base = np.log(base / (1.0 - base))   # base_score se guarda como probabilidad
+    base = np.broadcast_to(base, (n_clases,)).copy()
+
+    np.savez(
+        path,
+        feature=np.concatenate(feat),
+        umbral=np.concatenate(thr),
+        izq=np.concatenate(left),
+        der=np.concatenate(right),
+        defecto_izq=np.concatenate(dleft),
+        valor=np.concatenate(valor),
+        raices=np.asarray(raices, dtype=np.int32),
+        clase_arbol=np.asarray(tree_info, dtype=np.int32),
+        base_margen=base,
+        profundidad_max=np.int32(profundidad_max),
+        n_clases=np.int32(n_clases),
+        objetivo=np.array(objetivo),
+        features=np.array(booster.feature_names or []),
+    )
+    return path
+
+
+class EvaluadorNumpy:
+    """Carga el .npz exportado y evalúa margen / probabilidades por lotes."""
+
+    def __init__(self, arrays):
+        self.feature = arrays["feature"]
+        self.umbral = arrays["umbral"]
+        self.izq = arrays["izq"]
+        self.der = arrays["der"]
+        # hijos[2*nodo + ir_derecha] → un solo gather por nivel en lugar de dos + where
+        self.hijos = np.stack([self.izq, self.der], axis=1).ravel()
+        self.defecto_izq = arrays["defecto_izq"]
+        self.valor = arrays["valor"]
+        self.raices = arrays["raices"]
+        self.clase_arbol = arrays["clase_arbol"]
+        self.base_margen = arrays["base_margen"]
+        self.profundidad_max = int(arrays["profundidad_max"])
+        self.n_clases = int(arrays["n_clases"])
+        self.objetivo = str(arrays["objetivo"])
+        self.features = [str(f) for f in arrays["features"]]
+
+    @classmethod
+    def cargar(cls, path=NUMPY_PATH):
+        with np.load(path, allow_pickle=False) as z:
+            return cls({k: z[k] for k in z.files})
+
+    def _hojas(self, X):
+        """Índice global de la hoja alcanzada por cada (fila, árbol) → (n, n_arboles)."""
+        n, n_feat = X.shape
+        Xf = X.ravel()
+        desplazamiento = (np.arange(n, dtype=np.int32) * n_feat)[:, None]
+        nodo = np.broadcast_to(self.raices, (n, len(self.raices))).copy()
+        for _ in range(self.profundidad_max):
+            x = Xf.take(desplazamiento + self.feature.take(nodo))
+            # Igual que XGBoost: izquierda si x < umbral; NaN sigue la dirección por defecto
+            ir_der = np.where(np.isnan(x), ~self.defecto_izq.take(nodo), x >= self.umbral.take(nodo))
+            nodo = self.hijos.take(2 * nodo + ir_der)
+        return nodo
+
+    def margen(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        out = np.empty((X.shape[0], self.n_clases), dtype=np.float64)
+        for i in range(0, X.shape[0], BLOQUE):
+            valores = self.valor.take(self._hojas(X[i:i + BLOQUE]))
+            if self.n_clases == 1:
+                out[i:i + BLOQUE, 0] = valores.sum(axis=1, dtype=np.float64)
+            else:
+                for c in range(self.n_clases):
+                    out[i:i + BLOQUE, c] = valores[:, self.clase_arbol == c].sum(axis=1, dtype=np.float64)
+        return out + self.base_margen
+
+    def predict_proba(self, X):
+        m = self.margen(X)
+        if self.objetivo in ("binary:logistic", "reg:logistic"):
+            p1 = 1.0 / (1.0 + np.exp(-m[:, 0]))
+            return np.column_stack([1.0 - p1, p1])
+        if self.objetivo.startswith("multi:"):
+            e = np.exp(m - m.max(axis=1, keepdims=True))
+            return e / e.sum(axis=1, keepdims=True)
+        return m
+
+    def predict(self, X):
+        return self.predict_proba(X).argmax(axis=1)
+
+
+def benchmark(numpy_path=NUMPY_PATH, model_path=MODEL_PATH, tamanos=(10_000, 100_000, 1_000_000),
+              tolerancia=1e-5, seed=0):
+    """
+    Compara tiempos y resultados frente al booster nativo con filas muestreadas del catálogo
+    (con remuestreo para llegar al tamaño pedido). Devuelve lista de dicts.
+    """
+    import joblib
+    from catalogo import FEATURES, cargar_catalogo
+
+    model = joblib.load(model_path)
+    ev = EvaluadorNumpy.cargar(numpy_path)
+    base = cargar_catalogo()[FEATURES].to_numpy(dtype=np.float32)
+    rng = np.random.default_rng(seed)
+
+    resultados = []
+    for n in tamanos:
+        X = base[rng.integers(0, len(base), size=n)]
+        t = time.perf_counter()
+        p_nat = model.predict_proba(X)
+        t_nat = time.perf_counter() - t
+        t = time.perf_counter()
+        p_np = ev.predict_proba(X)
+        t_np = time.perf_counter() - t
+        err = float(np.abs(p_nat - p_np).max())
+        resultados.append({
+            "filas": n,
+            "nativo_s": round(t_nat, 4),
+            "numpy_s": round(t_np, 4),
+            "error_max": err,
+            "ok": err <= tolerancia,
+        })
+        print(f"{n:>9} filas | nativo {t_nat:8.3f} s | numpy {t_np:8.3f} s | error máx {err:.2e}")
+    return resultados
+
+
+if __name__ == "__main__":
+    accion = sys.argv[1] if len(sys.argv) > 1 else "exportar"
+    if accion == "exportar":
+        import joblib
+
+        origen = sys.argv[2] if len(sys.argv) > 2 else MODEL_PATH
+        destino = sys.argv[3] if len(sys.argv) > 3 else NUMPY_PATH
+        exportar(joblib.load(origen), destino)
+        print(f"✔ Modelo exportado a {destino}")
+    elif accion == "benchmark":
+        benchmark(*sys.argv[2:4])
+    else:
+        raise SystemExit(f"Acción desconocida: {accion} (usa exportar | benchmark)")
@@ -0,0 +1,122 @@
+# === Explicaciones por predicción con las contribuciones nativas del booster (pred_contribs) ===
+# Una sola llamada al booster devuelve las contribuciones por feature + bias; su suma es el
+# margen (logit), así que la probabilidad sale de la misma llamada sin un predict aparte.
+#
+# importancias_globales.json no se versiona: se genera con `python explicaciones.py` o, si falta
+# o corresponde a otro model.pkl (modelo_sha1), la API lo regenera en la primera petición.
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import xgboost as xgb
+
+from catalogo import BASE_DIR, FEATURES, cargar_catalogo
+
+IMPORTANCIAS_PATH = os.path.join(BASE_DIR, "importancias_globales.json")
+MODEL_PATH = os.path.join(BASE_DIR, "model.pkl")
+
+# Codificación del LabelEncoder del notebook (modelo binario)
+CLASES = ["FALSE POSITIVE", "PLANET"]
+
+
+def _softmax(m):
+    e = np.exp(m - m.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def contribuciones(model, X):
+    """
+    X: matriz (n, 9) en orden FEATURES.
+    Devuelve (proba (n, n_clases), contrib (n, n_clases, 9 + 1 bias)) en espacio logit.
+    En el caso binario la clase 0 recibe las contribuciones con signo contrario.
+    """
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    dm = xgb.DMatrix(np.asarray(X, dtype=float), feature_names=list(FEATURES))
+    contrib = booster.predict(dm, pred_contribs=True)
+
+    if contrib.ndim == 2:
+        margen = contrib.sum(axis=1)
+        p1 = 1.0 / (1.0 + np.exp(-margen))
+        proba = np.column_stack([1.0 - p1, p1])
+        contrib = np.stack([-contrib, contrib], axis=1)
+    else:
+        proba = _softmax(contrib.sum(axis=2))
+    return proba, contrib
+
+
+def top_features(contrib_fila, k=5):
+    """contrib_fila (n_clases, 9 + 1) → {clase: [{feature, contribucion}] por |contribución|}."""
+    out = {}
+    for c, fila in enumerate(contrib_fila):
+        valores = fila[:-1]
+        orden = np.argsort(-np.abs(valores), kind="stable")[:k]
+        nombre = CLASES[c] if c < len(CLASES) else str(c)
+        out[nombre] = [
+            {"feature": FEATURES[j], "contribucion": round(float(valores[j]), 5)} for j in orden
+        ]
+    return out
+
+
+def predecir_y_explicar(model, X, k=5):
+    """Probabilidades + top-k por clase para un lote, con una sola pasada por el booster."""
+    proba, contrib = contribuciones(model, X)
+    return proba, [
+        {"bias": round(float(cf[-1][-1]), 5), "top": top_features(cf, k)} for cf in contrib
+    ]
+
+
+def _sha1(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def calcular_importancias_globales(model, df, path=IMPORTANCIAS_PATH, model_path=MODEL_PATH):
+    """
+    Media de |contribución| por feature sobre el catálogo → JSON (se sirve ya calculado).
+    Sin fecha: el mismo modelo y catálogo dan el mismo fichero byte a byte.
+    """
+    _, contrib = contribuciones(model, df[FEATURES].to_numpy(dtype=float))
+    media = np.abs(contrib[:, -1, :-1]).mean(axis=0)
+    orden = np.argsort(-media, kind="stable")
+    data = {
+        "modelo_sha1": _sha1(model_path) if os.path.exists(model_path) else None,
+        "n_objetos": int(len(df)),
+        "metrica": "media |contribución| (logit, clase PLANET)",
+        "importancias": [
+            {"feature": FEATURES[j], "importancia": round(float(media[j]), 5)} for j in orden
+        ],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return data
+
+
+def cargar_importancias_globales(path=IMPORTANCIAS_PATH, model_path=MODEL_PATH):
+    """Importancias ya calculadas; None si no existen o son de otro model.pkl."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if os.path.exists(model_path) and data.get("modelo_sha1") != _sha1(model_path):
+        return None
+    return data
+
+
+def obtener_importancias_globales(model, df_fn, path=IMPORTANCIAS_PATH, model_path=MODEL_PATH):
+    """Las del fichero si están al día; si no (y hay modelo), se calculan sobre df_fn() y se guardan."""
+    data = cargar_importancias_globales(path, model_path)
+    if data is None and model is not None and hasattr(model, "get_booster"):
+        data = calcular_importancias_globales(model, df_fn(), path, model_path)
+    return data
+
+
+if __name__ == "__main__":
+    import joblib
+
+    t0 = time.time()
+    model = joblib.load(MODEL_PATH)
+    data = calcular_importancias_globales(model, cargar_catalogo())
+    print(f"✔ Importancias globales ({data['n_objetos']} objetos) → {IMPORTANCIAS_PATH}")
+    print(f"⏱ Tiempo total: {time.time() - t0:.1f} s")
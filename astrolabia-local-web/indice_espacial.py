@@ -0,0 +1,137 @@
+# === Índice espacial RA/DEC sobre el catálogo: búsquedas por cono y por caja ===
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+from catalogo import cargar_catalogo
+
+# Columnas que se devuelven por objeto (las mismas que usa el visor en exoplanetas_light.json)
+CAMPOS_SALIDA = [
+    "object_id", "RA", "DEC", "label", "mission",
+    "pl_radio", "pl_temperatura_eq", "periodo_orbital", "earth_similarity"
+]
+
+LIMITE_DEFECTO = 5000
+
+
+def radec_a_vector(ra, dec):
+    """RA/DEC en grados → vectores unitarios (n, 3)."""
+    ra = np.radians(np.asarray(ra, dtype=float))
+    dec = np.radians(np.asarray(dec, dtype=float))
+    cos_dec = np.cos(dec)
+    return np.column_stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)])
+
+
+class IndiceCielo:
+    """
+    KD-tree sobre vectores unitarios (cono) + orden por DEC (caja).
+
+    Sólo se indexan los objetos con RA y DEC válidos. Los filtros opcionales
+    (label, mission, pl_radio, earth_similarity) se aplican sobre los
+    candidatos que devuelve el índice, nunca sobre el catálogo entero.
+    """
+
+    def __init__(self, df):
+        # Sin copiar el DataFrame: las columnas son vistas (con catalogo_mmap/, del fichero
+        # compartido) y se indexan con self.filas; sólo el KD-tree y el orden por DEC son propios
+        self.df = df
+        self.filas = np.flatnonzero((df["RA"].notna() & df["DEC"].notna()).to_numpy())
+        self._ra = df["RA"].to_numpy(dtype=float)
+        self._radio = df["pl_radio"].to_numpy(dtype=float)
+        self._earth = df["earth_similarity"].to_numpy(dtype=float)
+        # label / mission como códigos de categoría (int8) en vez de arrays de str
+        self._label = pd.Categorical(df["label"])
+        self._mission = pd.Categorical(df["mission"])
+
+        dec = df["DEC"].to_numpy(dtype=float)[self.filas]
+        self.xyz = radec_a_vector(self._ra[self.filas], dec)
+        self.tree = KDTree(self.xyz, leaf_size=32)
+
+        # Para cajas: índices ordenados por DEC → rango con searchsorted
+        self.orden_dec = np.argsort(dec, kind="stable")
+        self.dec_ordenada = dec[self.orden_dec]
+
+    @classmethod
+    def desde_csv(cls, **kwargs):
+        return cls(cargar_catalogo(**kwargs))
+
+    def __len__(self):
+        return len(self.filas)
+
+    # ---------- filtros ----------
+    @staticmethod
+    def _en(categorica, filas, valores):
+        """Máscara de las filas cuya categoría está en `valores` (comparando códigos)."""
+        codigos = categorica.categories.get_indexer(list(valores))
+        return np.isin(categorica.codes[filas], codigos[codigos >= 0])
+
+    def _filtrar(self, idx, label=None, mission=None, radio_min=None, radio_max=None,
+                 earth_min=None, earth_max=None):
+        mask = np.ones(len(idx), dtype=bool)
+        filas = self.filas[idx]
+        if label:
+            labels = [label] if isinstance(label, str) else list(label)
+            mask &= self._en(self._label, filas, [str(l).upper() for l in labels])
+        if mission:
+            missions = [mission] if isinstance(mission, str) else list(mission)
+            mask &= self._en(self._mission, filas, missions)
+        # Las comparaciones con NaN son False → los objetos sin dato quedan fuera del filtro
+        if radio_min is not None:
+            mask &= self._radio[filas] >= float(radio_min)
+        if radio_max is not None:
+            mask &= self._radio[filas] <= float(radio_max)
+        if earth_min is not None:
+            mask &= self._earth[filas] >= float(earth_min)
+        if earth_max is not None:
+            mask &= self._earth[filas] <= float(earth_max)
+        return idx[mask]
+
+    def _registros(self, idx, extra=None):
+        filas = self.df.iloc[self.filas[idx]][CAMPOS_SALIDA]
+        out = []
+        for i, row in enumerate(filas.itertuples(index=False)):
+            rec = {}
+            for campo, v in zip(CAMPOS_SALIDA, row):
+                if isinstance(v, float) and np.isnan(v):
+                    v = None
+                rec[campo] = v
+            if extra is not None:
+                rec["distancia"] = float(extra[i])
+            out.append(rec)
+        return out
+
+    # ---------- consultas ----------
+    def cono(self, ra, dec, radio, limite=LIMITE_DEFECTO, **filtros):
+        """
+        Objetos a menos de `radio` grados de (ra, dec), ordenados por distancia angular.
+        Devuelve (total_que_cumple, registros[:limite]).
+        """
+        radio = min(float(radio), 180.0)
+        centro = radec_a_vector([ra], [dec])
+        cuerda = 2.0 * np.sin(np.radians(radio) / 2.0)
+        idx = self.tree.query_radius(centro, r=cuerda)[0]
+        idx = self._filtrar(idx, **filtros)
+
+        cos_ang = np.clip(self.xyz[idx] @ centro[0], -1.0, 1.0)
+        dist = np.degrees(np.arccos(cos_ang))
+        orden = np.argsort(dist, kind="stable")[:limite]
+        return len(idx), self._registros(idx[orden], extra=dist[orden])
+
+    def caja(self, ra_min, ra_max, dec_min, dec_max, limite=LIMITE_DEFECTO, **filtros):
+        """
+        Objetos dentro de la caja RA/DEC (grados). Si ra_min > ra_max la caja cruza RA=0/360.
+        Devuelve (total_que_cumple, registros[:limite]).
+        """
+        lo = np.searchsorted(self.dec_ordenada, float(dec_min), side="left")
+        hi = np.searchsorted(self.dec_ordenada, float(dec_max), side="right")
+        idx = self.orden_dec[lo:hi]
+
+        ra = self._ra[self.filas[idx]]
+        ra_min, ra_max = float(ra_min), float(ra_max)
+        if ra_min <= ra_max:
+            idx = idx[(ra >= ra_min) & (ra <= ra_max)]
+        else:
+            idx = idx[(ra >= ra_min) | (ra <= ra_max)]
+
+        idx = self._filtrar(np.sort(idx), **filtros)
+        return len(idx), self._registros(idx[:limite])
@@ -1,16 +1,24 @@
+import copy
+import os
+import queue
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+
 import numpy as np
 import skfuzzy as fuzz
 from skfuzzy import control as ctrl
+from skfuzzy.control.term import Term, TermAggregate
+
+from perfilado import etapa
 
 
-def definir_variables(entrada: dict):
+def construir_sistema():
     """
-    entrada: dict con claves:
-      radius (R⊕), teq (K), insol (S⊕), period (días),
-      st_teff (K), st_rad (R☉), st_logg (cgs)
+    Universos, membresías y reglas: no dependen de la entrada, así que se construyen una vez.
 
     Devuelve:
-      score (float 0..100), categorias (dict con categoría dominante y grados por variable)
+      variables (dict nombre -> Antecedent), sistema (ctrl.ControlSystem)
     """
 
     # ---------- Universos de discurso ----------
@@ -57,39 +65,6 @@ def definir_variables(entrada: dict):
     st_logg['media'] = fuzz.gbellmf(st_logg.universe, a=0.2, b=2.0, c=4.4)
     st_logg['alta']  = fuzz.smf(st_logg.universe, 4.6, 5.0)
 
-    # ---------- Evaluación crisp → categoría por variable ----------
-    v_radius  = float(entrada.get('radius', 1.0))
-    v_teq     = float(entrada.get('teq', 290))
-    v_insol   = float(entrada.get('insol', 1.0))
-    v_period  = float(entrada.get('period', 20))
-    v_st_teff = float(entrada.get('st_teff', 5700))
-    v_st_rad  = float(entrada.get('st_rad', 1.0))
-    v_st_logg = float(entrada.get('st_logg', 4.4))
-
-    def argmax_membership(var, value):
-        grados = {}
-        for label, mf in var.terms.items():
-            mu = fuzz.interp_membership(var.universe, mf.mf, value)
-            grados[label] = float(mu)
-        cat = max(grados.items(), key=lambda kv: kv[1])[0]
-        return cat, grados
-
-    categorias = {}
-    cat_r, grados_r = argmax_membership(radius, v_radius)
-    categorias['radius'] = {"valor": v_radius, "categoria": cat_r, "grados": grados_r}
-    cat_t, grados_t = argmax_membership(teq, v_teq)
-    categorias['teq'] = {"valor": v_teq, "categoria": cat_t, "grados": grados_t}
-    cat_i, grados_i = argmax_membership(insol, v_insol)
-    categorias['insol'] = {"valor": v_insol, "categoria": cat_i, "grados": grados_i}
-    cat_p, grados_p = argmax_membership(period, v_period)
-    categorias['period'] = {"valor": v_period, "categoria": cat_p, "grados": grados_p}
-    cat_tt, grados_tt = argmax_membership(st_teff, v_st_teff)
-    categorias['st_teff'] = {"valor": v_st_teff, "categoria": cat_tt, "grados": grados_tt}
-    cat_sr, grados_sr = argmax_membership(st_rad, v_st_rad)
-    categorias['st_rad'] = {"valor": v_st_rad, "categoria": cat_sr, "grados": grados_sr}
-    cat_gl, grados_gl = argmax_membership(st_logg, v_st_logg)
-    categorias['st_logg'] = {"valor": v_st_logg, "categoria": cat_gl, "grados": grados_gl}
-
     # ======= Consecuente (salida difusa) =======
     similaridad_tierra = ctrl.Consequent(np.arange(0, 100.1, 0.1), 'similaridad_tierra')
     U = similaridad_tierra.universe
@@ -109,14 +84,14 @@ def definir_variables(entrada: dict):
         teq['templado'] & insol['terrestre'] & radius['terrestre'] &
         (st_teff['solar'] | st_rad['solar'] | st_logg['media']) &
         (period['medio'] | period['largo']),
-        similaridad_tierra['idéntica']
+        similaridad_tierra['idéntica'], label='r1'
     ); r1.weight = 1.0; rules.append(r1)
 
     # Vía adicional a idéntica (más flexible)
     r21 = ctrl.Rule(
         teq['templado'] & insol['terrestre'] & radius['terrestre'] &
         ((st_teff['solar'] | st_rad['solar'] | st_logg['media']) | (period['medio'] | period['largo'])),
-        similaridad_tierra['idéntica']
+        similaridad_tierra['idéntica'], label='r21'
     ); r21.weight = 0.95; rules.append(r21)
 
     # Refuerzo (estricto) sin estrella mala ni tamaño no-terrestre
@@ -124,89 +99,89 @@ def definir_variables(entrada: dict):
         teq['templado'] & insol['terrestre'] & radius['terrestre'] &
         ~(st_rad['gigante'] | st_logg['baja']) &
         ~(radius['pequeño'] | radius['grande']),
-        similaridad_tierra['idéntica']
+        similaridad_tierra['idéntica'], label='r22'
     ); r22.weight = 0.5; rules.append(r22)
 
     # --- Similar (alto) con gating anti-gigantes ---
     r2 = ctrl.Rule(
         teq['templado'] & insol['terrestre'] & radius['terrestre'] &
         ~(st_rad['gigante'] | st_logg['baja']),
-        similaridad_tierra['similar']
+        similaridad_tierra['similar'], label='r2'
     ); r2.weight = 0.9; rules.append(r2)
 
     r3 = ctrl.Rule(teq['templado'] & insol['terrestre'] & st_teff['solar'] &
                    radius['terrestre'] & ~(st_rad['gigante'] | st_logg['baja']),
-                   similaridad_tierra['similar'])
+                   similaridad_tierra['similar'], label='r3')
     r3.weight = 0.8; rules.append(r3)
 
     r4 = ctrl.Rule(teq['templado'] & insol['terrestre'] & st_rad['solar'] &
                    radius['terrestre'] & ~(st_rad['gigante'] | st_logg['baja']),
-                   similaridad_tierra['similar'])
+                   similaridad_tierra['similar'], label='r4')
     r4.weight = 0.8; rules.append(r4)
 
     r5 = ctrl.Rule(teq['templado'] & insol['terrestre'] & st_logg['media'] &
                    radius['terrestre'] & ~(st_rad['gigante'] | st_logg['baja']),
-                   similaridad_tierra['similar'])
+                   similaridad_tierra['similar'], label='r5')
     r5.weight = 0.8; rules.append(r5)
 
     # Similar con periodo (poco peso)
     r6 = ctrl.Rule(
         radius['terrestre'] & (period['medio'] | period['largo']) &
         (insol['terrestre'] | teq['templado']),
-        similaridad_tierra['similar']
+        similaridad_tierra['similar'], label='r6'
     ); r6.weight = 0.5; rules.append(r6)
 
     # --- Tamaño no terrestre con clima ideal (algo) ---
     r7 = ctrl.Rule(teq['templado'] & insol['terrestre'] & radius['pequeño'],
-                   similaridad_tierra['algo'])
+                   similaridad_tierra['algo'], label='r7')
     r7.weight = 0.95; rules.append(r7)
 
     r8 = ctrl.Rule(teq['templado'] & insol['terrestre'] & radius['grande'],
-                   similaridad_tierra['algo'])
+                   similaridad_tierra['algo'], label='r8')
     r8.weight = 0.8; rules.append(r8)
 
     # --- Extremos / condiciones claramente desfavorables (nada) ---
     r9  = ctrl.Rule((teq['caliente'] & insol['alta']) | (teq['frío'] & insol['baja']),
-                    similaridad_tierra['nada'])
+                    similaridad_tierra['nada'], label='r9')
     r9.weight = 1.0; rules.append(r9)
 
     r10 = ctrl.Rule(radius['grande'] & (teq['caliente'] | insol['alta']),
-                    similaridad_tierra['nada'])
+                    similaridad_tierra['nada'], label='r10')
     r10.weight = 1.0; rules.append(r10)
 
     r11 = ctrl.Rule(st_rad['gigante'] | st_logg['baja'],
-                    similaridad_tierra['nada'])
+                    similaridad_tierra['nada'], label='r11')
     r11.weight = 1.0; rules.append(r11)
 
     r12 = ctrl.Rule(period['ultracorto'] & insol['alta'],
-                    similaridad_tierra['nada'])
+                    similaridad_tierra['nada'], label='r12')
     r12.weight = 0.9; rules.append(r12)
 
     r13 = ctrl.Rule(st_teff['caliente'] & insol['alta'],
-                    similaridad_tierra['nada'])
+                    similaridad_tierra['nada'], label='r13')
     r13.weight = 1.0; rules.append(r13)
 
     # --- Compatibilidades con M-enanas (frías) ---
     r14 = ctrl.Rule(st_teff['fría'] & insol['terrestre'] & teq['templado'] & radius['terrestre'],
-                    similaridad_tierra['similar'])
+                    similaridad_tierra['similar'], label='r14')
     r14.weight = 0.85; rules.append(r14)
 
     r15 = ctrl.Rule(st_teff['fría'] & insol['baja'] & ~radius['terrestre'],
-                    similaridad_tierra['algo'])
+                    similaridad_tierra['algo'], label='r15')
     r15.weight = 0.7; rules.append(r15)
 
     # --- Ajustes por periodo (influencia moderada) ---
     r16 = ctrl.Rule(period['corto'] & insol['alta'] & radius['terrestre'],
-                    similaridad_tierra['algo'])
+                    similaridad_tierra['algo'], label='r16')
     r16.weight = 0.5; rules.append(r16)
 
     r17 = ctrl.Rule(period['largo'] & insol['baja'] & teq['frío'],
-                    similaridad_tierra['algo'])
+                    similaridad_tierra['algo'], label='r17')
     r17.weight = 0.6; rules.append(r17)
 
     # --- Bonos por estrella compacta/estable ---
     r18 = ctrl.Rule((insol['terrestre'] & teq['templado']) & (st_rad['enana'] & st_logg['alta']),
-                    similaridad_tierra['similar'])
+                    similaridad_tierra['similar'], label='r18')
     r18.weight = 0.85; rules.append(r18)
 
     # --- Escalado adicional a idéntica cuando casi todo encaja ---
@@ -215,20 +190,20 @@ def definir_variables(entrada: dict):
         (st_teff['solar'] | st_rad['solar'] | st_logg['media']) &
         (period['medio'] | period['largo']) &
         radius['terrestre'],
-        similaridad_tierra['idéntica']
+        similaridad_tierra['idéntica'], label='r19'
     )
     r19.weight = 0.95; rules.append(r19)
 
     r20 = ctrl.Rule(
         teq['templado'] & insol['terrestre'] & (radius['pequeño'] | radius['grande']),
-        similaridad_tierra['algo']
+        similaridad_tierra['algo'], label='r20'
     )
     r20.weight = 0.8; rules.append(r20)
 
     # Refuerzo negativo si estrella mala pero clima/luz bonitos (evita “similar” artificial)
     r23 = ctrl.Rule(
         (st_rad['gigante'] | st_logg['baja']) & (teq['templado'] | insol['terrestre']),
-        similaridad_tierra['nada']
+        similaridad_tierra['nada'], label='r23'
     )
     r23.weight = 1.0; rules.append(r23)
 
@@ -237,20 +212,316 @@ def definir_variables(entrada: dict):
         teq['templado'] & insol['terrestre'] & radius['terrestre'] &
         ~(period['ultracorto'] | period['corto']) &
         ~(st_rad['gigante'] | st_logg['baja']),
-        similaridad_tierra['idéntica']
+        similaridad_tierra['idéntica'], label='r24'
     ); r24.weight = 0.7; rules.append(r24)
 
-    # Sistema y simulación
+    # Sistema (la simulación se crea por evaluación)
     sistema = ctrl.ControlSystem(rules)
-    sim = ctrl.ControlSystemSimulation(sistema)
-
-    sim.input['radius']  = v_radius
-    sim.input['teq']     = v_teq
-    sim.input['insol']   = v_insol
-    sim.input['period']  = v_period
-    sim.input['st_teff'] = v_st_teff
-    sim.input['st_rad']  = v_st_rad
-    sim.input['st_logg'] = v_st_logg
-
-    sim.compute()
-    return sim.output['similaridad_tierra'], categorias
\ No newline at end of file
+    variables = {
+        'radius': radius, 'teq': teq, 'insol': insol, 'period': period,
+        'st_teff': st_teff, 'st_rad': st_rad, 'st_logg': st_logg,
+    }
+    return variables, sistema
+
+
+_SISTEMA = None
+_LOCK_SISTEMA = threading.Lock()
+
+# Plazas máximas del pool por proceso (hilos que pueden puntuar a la vez)
+POOL_TAMANO = int(os.environ.get("ASTROLAB_POOL_DIFUSO", "8"))
+
+
+def obtener_sistema():
+    """
+    Sistema compartido del proceso (construir el ControlSystem es lo más caro).
+    Es la plantilla de sólo lectura: las simulaciones se hacen sobre copias (PoolSimulaciones).
+    """
+    global _SISTEMA
+    if _SISTEMA is None:
+        with _LOCK_SISTEMA:
+            if _SISTEMA is None:
+                with etapa("difuso.construir_sistema"):
+                    _SISTEMA = construir_sistema()
+    return _SISTEMA
+
+
+class PoolSimulaciones:
+    """
+    Simulaciones reutilizables y seguras entre hilos, con un máximo de `tamano` plazas.
+
+    skfuzzy guarda el estado de cada simulación en los propios términos del ControlSystem
+    (indexado por un hash de las entradas) y la entrada 'current' de cada Antecedent es única,
+    así que dos hilos no pueden simular a la vez sobre el mismo sistema aunque usen
+    ControlSystemSimulation distintas. Cada plaza tiene su copia del sistema compilado
+    (deepcopy: ~6 ms frente a ~350 ms de construirlo) y una simulación que se reutiliza.
+    Las plazas se crean bajo demanda; si están todas prestadas, `prestar` espera a que se libere una.
+    """
+
+    def __init__(self, tamano=POOL_TAMANO):
+        self.tamano = max(1, int(tamano))
+        self._libres = queue.LifoQueue()   # LIFO: se reutilizan las plazas "calientes"
+        self._creadas = 0
+        self._lock = threading.Lock()
+
+    def _crear(self):
+        variables, sistema = copy.deepcopy(obtener_sistema())
+        return variables, ctrl.ControlSystemSimulation(sistema)
+
+    @contextmanager
+    def prestar(self, timeout=None):
+        """with pool.prestar() as (variables, sim): ...  (queue.Empty si vence `timeout`)."""
+        try:
+            plaza = self._libres.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                crear = self._creadas < self.tamano
+                if crear:
+                    self._creadas += 1
+            if crear:
+                try:
+                    plaza = self._crear()
+                except BaseException:
+                    with self._lock:
+                        self._creadas -= 1
+                    raise
+            else:
+                plaza = self._libres.get(timeout=timeout)
+        try:
+            yield plaza
+        finally:
+            self._libres.put(plaza)
+
+    def estado(self):
+        return {"tamano": self.tamano, "creadas": self._creadas, "libres": self._libres.qsize()}
+
+
+_POOL = None
+
+
+def obtener_pool():
+    """Pool por defecto del proceso (los scripts de un solo hilo sólo llegan a crear una plaza)."""
+    global _POOL
+    if _POOL is None:
+        with _LOCK_SISTEMA:
+            if _POOL is None:
+                _POOL = PoolSimulaciones()
+    return _POOL
+
+
+# Orden de las entradas en los lotes (n, 7) y valores por defecto de definir_variables
+ENTRADAS = ['radius', 'teq', 'insol', 'period', 'st_teff', 'st_rad', 'st_logg']
+DEFAULTS = {'radius': 1.0, 'teq': 290.0, 'insol': 1.0, 'period': 20.0,
+            'st_teff': 5700.0, 'st_rad': 1.0, 'st_logg': 4.4}
+
+
+def compilar_antecedente(nodo, terminos):
+    """Árbol de skfuzzy → tupla ('t', k) | ('and'|'or', a, b) | ('not', a); k indexa `terminos`."""
+    if isinstance(nodo, Term):
+        clave = (nodo.parent.label, nodo.label)
+        if clave not in terminos:
+            terminos[clave] = len(terminos)
+        return ("t", terminos[clave])
+    if isinstance(nodo, TermAggregate):
+        if nodo.kind == "not":
+            return ("not", compilar_antecedente(nodo.term1, terminos))
+        return (nodo.kind, compilar_antecedente(nodo.term1, terminos),
+                compilar_antecedente(nodo.term2, terminos))
+    raise TypeError(f"Antecedente no soportado: {nodo!r}")
+
+
+def evaluar_antecedente(arbol, grados):
+    """Disparo del antecedente compilado (AND = mínimo, OR = máximo, NOT = 1 - x) sobre arrays."""
+    if arbol[0] == "t":
+        return grados[arbol[1]]
+    if arbol[0] == "not":
+        return 1.0 - evaluar_antecedente(arbol[1], grados)
+    a = evaluar_antecedente(arbol[1], grados)
+    b = evaluar_antecedente(arbol[2], grados)
+    return np.fmin(a, b) if arbol[0] == "and" else np.fmax(a, b)
+
+
+class _ReglasCompiladas:
+    """Términos y reglas del sistema compartido en forma de arrays, para explicar lotes."""
+
+    def __init__(self):
+        variables, sistema = obtener_sistema()
+        self.etiquetas = {var: list(variables[var].terms) for var in ENTRADAS}
+        self.universos = {var: variables[var].universe.astype(float) for var in ENTRADAS}
+        self.mfs = {var: np.stack([t.mf for t in variables[var].terms.values()]).astype(float)
+                    for var in ENTRADAS}
+
+        terminos = {}
+        self.reglas = []          # (árbol, metadatos) por cada consecuente de cada regla
+        for regla in sistema.rules:
+            arbol = compilar_antecedente(regla.antecedent, terminos)
+            for c in regla.consequent:
+                self.reglas.append((arbol, {
+                    "regla": regla.label,
+                    "antecedente": str(regla.antecedent),
+                    "consecuente": c.term.label,
+                    "peso": float(c.weight),   # skfuzzy sólo pondera el consecuente, no regla.weight
+                }))
+        self.terminos = list(terminos)
+        self.columna = [ENTRADAS.index(var) for var, _ in self.terminos]
+        self.indice = [self.etiquetas[var].index(label) for var, label in self.terminos]
+
+
+_COMPILADAS = None
+_LOCK_COMPILADAS = threading.Lock()   # propio: _ReglasCompiladas llama a obtener_sistema (_LOCK_SISTEMA)
+
+
+def _reglas_compiladas():
+    global _COMPILADAS
+    if _COMPILADAS is None:
+        with _LOCK_COMPILADAS:
+            if _COMPILADAS is None:
+                _COMPILADAS = _ReglasCompiladas()
+    return _COMPILADAS
+
+
+class ExplicacionLote:
+    """
+    Explicación perezosa de un lote de entradas (n, 7) en orden ENTRADAS: no se calcula nada
+    hasta que se pide, y todo sale como arrays.
+
+      grados[var]      (n, n_términos) membresía de cada término de `etiquetas[var]`
+      dominantes[var]  (n,) índice del término con mayor membresía
+      disparos         (n, n_reglas) activación del antecedente de cada regla de `reglas`
+    """
+
+    def __init__(self, X):
+        self.X = np.atleast_2d(np.asarray(X, dtype=float))
+        self._grados = None
+        self._dominantes = None
+        self._disparos = None
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    @property
+    def etiquetas(self):
+        return _reglas_compiladas().etiquetas
+
+    @property
+    def reglas(self):
+        return [meta for _, meta in _reglas_compiladas().reglas]
+
+    @property
+    def grados(self):
+        # Como argmax_membership de antes: fuera del universo la membresía es 0
+        if self._grados is None:
+            c = _reglas_compiladas()
+            with etapa("difuso.categorias"):
+                self._grados = {
+                    var: np.stack([np.interp(self.X[:, j], c.universos[var], mf, left=0.0, right=0.0)
+                                   for mf in c.mfs[var]], axis=1)
+                    for j, var in enumerate(ENTRADAS)
+                }
+        return self._grados
+
+    @property
+    def dominantes(self):
+        if self._dominantes is None:
+            self._dominantes = {var: g.argmax(axis=1) for var, g in self.grados.items()}
+        return self._dominantes
+
+    @property
+    def disparos(self):
+        # Como la simulación: entradas recortadas al universo (clip_to_bounds)
+        if self._disparos is None:
+            c = _reglas_compiladas()
+            with etapa("difuso.disparos"):
+                X = np.column_stack([np.clip(self.X[:, j], c.universos[var][0], c.universos[var][-1])
+                                     for j, var in enumerate(ENTRADAS)])
+                g = [np.interp(X[:, j], c.universos[var], c.mfs[var][k])
+                     for (var, _), j, k in zip(c.terminos, c.columna, c.indice)]
+                self._disparos = np.column_stack(
+                    [np.broadcast_to(evaluar_antecedente(arbol, g), len(self)) for arbol, _ in c.reglas])
+        return self._disparos
+
+    def __getitem__(self, i):
+        """Explicación de la fila i (comparte lo ya calculado para el lote)."""
+        return Explicacion(dict(zip(ENTRADAS, self.X[i].tolist())), lote=self, fila=i)
+
+
+class Explicacion(Mapping):
+    """
+    Explicación perezosa de una entrada. Como Mapping equivale al dict `categorias` de siempre
+    (variable → {"valor", "categoria", "grados"}); `reglas` añade el disparo de cada regla.
+    """
+
+    def __init__(self, valores, lote=None, fila=0):
+        self.valores = valores
+        self._lote = lote if lote is not None else ExplicacionLote([[valores[k] for k in ENTRADAS]])
+        self._fila = fila
+        self._categorias = None
+
+    @property
+    def grados(self):
+        etiquetas = self._lote.etiquetas
+        return {var: dict(zip(etiquetas[var], g[self._fila].tolist())) for var, g in self._lote.grados.items()}
+
+    @property
+    def dominantes(self):
+        etiquetas = self._lote.etiquetas
+        return {var: etiquetas[var][int(k[self._fila])] for var, k in self._lote.dominantes.items()}
+
+    @property
+    def categorias(self):
+        if self._categorias is None:
+            grados, dominantes = self.grados, self.dominantes
+            self._categorias = {var: {"valor": self.valores[var], "categoria": dominantes[var], "grados": grados[var]}
+                                for var in ENTRADAS}
+        return self._categorias
+
+    @property
+    def reglas(self):
+        """Reglas ordenadas de mayor a menor disparo: dicts {regla, antecedente, consecuente, peso, disparo}."""
+        disparos = self._lote.disparos[self._fila]
+        reglas = [dict(meta, disparo=float(d)) for meta, d in zip(self._lote.reglas, disparos)]
+        return sorted(reglas, key=lambda r: -r["disparo"])
+
+    def __getitem__(self, var):
+        return self.categorias[var]
+
+    def __iter__(self):
+        return iter(ENTRADAS)
+
+    def __len__(self):
+        return len(ENTRADAS)
+
+
+def _valores(entrada):
+    return {k: float(entrada.get(k, DEFAULTS[k])) for k in ENTRADAS}
+
+
+def explicar_lote(entradas):
+    """Lista de dicts (mismos defaults que definir_variables) o matriz (n, 7) → ExplicacionLote."""
+    if isinstance(entradas, np.ndarray):
+        return ExplicacionLote(entradas)
+    return ExplicacionLote([[v[k] for k in ENTRADAS] for v in map(_valores, entradas)])
+
+
+def definir_variables(entrada: dict, pool=None):
+    """
+    entrada: dict con claves:
+      radius (R⊕), teq (K), insol (S⊕), period (días),
+      st_teff (K), st_rad (R☉), st_logg (cgs)
+
+    pool: PoolSimulaciones donde evaluar (por defecto el del proceso); seguro entre hilos.
+
+    Devuelve:
+      score (float 0..100), explicacion (Explicacion perezosa: se usa como el dict de categorías
+      de antes y además da `grados`, `dominantes` y `reglas`; no cuesta nada si no se consulta)
+    """
+
+    valores = _valores(entrada)
+
+    # Simulación prestada del pool (su estado no lo comparte ningún otro hilo)
+    with (pool or obtener_pool()).prestar() as (_, sim):
+        for k in ENTRADAS:
+            sim.input[k] = valores[k]
+
+        with etapa("difuso.compute"):
+            sim.compute()
+        return sim.output['similaridad_tierra'], Explicacion(valores)
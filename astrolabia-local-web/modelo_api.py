@@ -1,9 +1,23 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 import joblib
 import numpy as np
 from flask_cors import CORS
 import traceback
 import os
+import threading
+import time
+
+from barrido_difuso import barrer, carga_util
+from catalogo import FEATURES, cargar_catalogo
+from catalogo_mmap import MMAP_DIR, CatalogoCompartido
+from explicaciones import obtener_importancias_globales, predecir_y_explicar
+from indice_espacial import IndiceCielo
+from logicaDifusa import definir_variables
+from rankings import Rankings
+from resultados_db import DB_PATH, ResultadosDB
+from surrogado_difuso import SurrogadoDifuso
+from trabajos import ColaTrabajos
+from vecinos import IndiceVecinos
 
 app = Flask(__name__)
 CORS(app)
@@ -25,6 +39,36 @@ except Exception as e:
     model = None
     traceback.print_exc()
 
+importancias_globales = None   # se cargan (o regeneran) en la primera petición a /explicacion/global
+
+try:
+    vecinos = IndiceVecinos.cargar()
+except Exception as e:
+    vecinos = None
+    traceback.print_exc()
+
+try:
+    surrogado = SurrogadoDifuso.cargar()
+except Exception as e:
+    surrogado = None
+    traceback.print_exc()
+
+# Cola de trabajos asíncronos (envíos grandes); 0 workers = sólo encola (usar `python trabajos.py worker`).
+# Los workers arrancan con la primera petición del proceso que sirve, no al importar: así no los
+# lanzan el proceso padre del reloader de Flask ni los scripts que importan este módulo.
+cola = ColaTrabajos(model=model)
+_cola_iniciada = False
+_lock_cola = threading.Lock()
+
+@app.before_request
+def iniciar_cola():
+    global _cola_iniciada
+    if not _cola_iniciada:
+        with _lock_cola:
+            if not _cola_iniciada:
+                cola.iniciar(int(os.environ.get("ASTROLAB_TRABAJOS_WORKERS", "2")))
+                _cola_iniciada = True
+
 @app.route('/predict', methods=['POST'])
 def predict():
     if model is None:
@@ -36,17 +80,18 @@ def predict():
     try:
         data = request.get_json(force=True)
 
-        X = np.array([[
-            data.get("pl_radio", 0),
-            data.get("profundidad", 0),
-            data.get("periodo_orbital", 0),
-            data.get("insolacion", 0),
-            data.get("duracion_transito", 0),
-            data.get("st_radio", 0),
-            data.get("st_temperatura", 0),
-            data.get("pl_temperatura_eq", 0),
-            data.get("st_gravedad", 0)
-        ]])
+        # Mismo orden de columnas que en el entrenamiento (FEATURES)
+        X = np.array([[data.get(f, 0) for f in FEATURES]], dtype=float)
+
+        # Modo explicación: probabilidad + contribuciones nativas del booster en una sola llamada
+        if data.get("explicar"):
+            if not hasattr(model, "get_booster"):
+                return jsonify({"error": "El modelo cargado no admite explicaciones (no es XGBoost)."}), 400
+            proba, explicaciones = predecir_y_explicar(model, X, k=int(data.get("top_k", 5)))
+            return jsonify({
+                "prediccion": float(proba[0][1] * 100),
+                "explicacion": explicaciones[0]
+            })
 
         # Intentar predicción según capacidades del modelo
         if hasattr(model, "predict_proba"):
@@ -69,6 +114,339 @@ def predict():
             "trace": traceback.format_exc()
         }), 500
 
+@app.route('/score', methods=['POST'])
+def score():
+    """
+    earth_similarity de una entrada difusa {radius, teq, insol, period, st_teff, st_rad, st_logg}.
+    "modo": "surrogado" (por defecto si está entrenado; fuera de su región o sin reglas usa el sistema
+    vectorizado de barrido_difuso y responde modo "vectorizado") o "exacto" (skfuzzy).
+    En modo exacto, "reglas": true añade el disparo de cada regla difusa a la respuesta.
+    """
+    try:
+        data = request.get_json(force=True)
+        modo = data.get("modo", "surrogado" if surrogado is not None else "exacto")
+        if modo == "surrogado":
+            if surrogado is None:
+                return jsonify({"error": "Surrogado no entrenado (genera surrogado_difuso.npz con `python surrogado_difuso.py`)."}), 400
+            valor, modo_usado = surrogado.puntuar(data)
+            if np.isnan(valor):
+                raise KeyError("similaridad_tierra")
+            resp = {"earth_similarity": round(valor, 2), "modo": modo_usado}
+            if modo_usado == "surrogado":
+                resp["error_max"] = round(surrogado.error_max, 2)
+                resp["error_p99"] = round(surrogado.error_p99, 2)
+            return jsonify(resp)
+        if modo == "exacto":
+            valor, explicacion = definir_variables(data)
+            resp = {"earth_similarity": round(float(valor), 2), "modo": "exacto",
+                    "categorias": explicacion.categorias}
+            if data.get("reglas"):
+                resp["reglas"] = explicacion.reglas
+            return jsonify(resp)
+        return jsonify({"error": f"Modo desconocido: {modo}"}), 400
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Datos inválidos: {e}"}), 400
+    except KeyError:
+        return jsonify({"error": "Ninguna regla difusa se activó para esta entrada."}), 422
+
+@app.route('/score/barrido', methods=['POST'])
+def score_barrido():
+    """
+    Mapa 2D de earth_similarity: {"base": {...}, "x": {"variable", "min", "max", "pasos"}, "y": {...}}.
+    Devuelve la malla (fila = valor de y) como float32 en base64, o listas con "formato": "json".
+    """
+    try:
+        data = request.get_json(force=True)
+        t0 = time.perf_counter()
+        malla, xs, ys = barrer(data.get("base") or {}, data["x"], data["y"])
+        resp = carga_util(malla, xs, ys, data["x"], data["y"], data.get("formato", "base64"))
+        resp["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        return jsonify(resp)
+    except KeyError as e:
+        return jsonify({"error": f"Falta el campo {e}"}), 400
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Datos inválidos: {e}"}), 400
+
+@app.route('/explicacion/global', methods=['GET'])
+def explicacion_global():
+    """Importancias globales (importancias_globales.json; se regenera si falta o es de otro modelo)"""
+    global importancias_globales
+    if importancias_globales is None:
+        importancias_globales = obtener_importancias_globales(model, lambda: get_catalogo())
+    if importancias_globales is None:
+        return jsonify({"error": "No hay importancias globales: el modelo no está cargado o no es XGBoost."}), 404
+    return jsonify(importancias_globales)
+
+
+# ========= Catálogo: índice espacial RA/DEC y rankings =========
+_compartido = None
+_catalogo = None
+_indice = None
+_rankings = None
+_rankings_marca = None
+_rankings_sincronizado = 0.0
+_lock_rankings = threading.Lock()
+_resultados = None
+
+SINCRONIZAR_RANKINGS_S = 5.0   # cada cuánto se recogen los cambios de resultados.db en los rankings
+
+def get_compartido():
+    """Catálogo materializado (catalogo_mmap/) mapeado en memoria; None si no se ha generado."""
+    global _compartido
+    if _compartido is None and os.path.isdir(MMAP_DIR):
+        _compartido = CatalogoCompartido.cargar()
+    return _compartido
+
+def get_catalogo():
+    """
+    DataFrame del catálogo, una vez por proceso. Si existe catalogo_mmap/ las columnas
+    numéricas son vistas del fichero compartido por todos los workers; si no, se lee el CSV.
+    """
+    global _catalogo
+    if _catalogo is None:
+        compartido = get_compartido()
+        _catalogo = compartido.dataframe() if compartido is not None else cargar_catalogo()
+    return _catalogo
+
+def get_indice():
+    global _indice
+    if _indice is None:
+        _indice = IndiceCielo(get_catalogo())
+    return _indice
+
+def get_rankings():
+    """Rankings del catálogo al día con resultados.db (lo que escriben los scripts de scoring)."""
+    global _rankings, _rankings_marca, _rankings_sincronizado
+    with _lock_rankings:
+        if _rankings is None:
+            _rankings = Rankings.desde_catalogo(get_catalogo(), model)
+        db = get_resultados()
+        if db is not None and time.monotonic() - _rankings_sincronizado >= SINCRONIZAR_RANKINGS_S:
+            filas, _rankings_marca = db.cambios_desde(_rankings_marca)
+            _rankings.sincronizar(filas)
+            _rankings_sincronizado = time.monotonic()
+    return _rankings
+
+def get_resultados():
+    """resultados.db (upserts del pipeline de scoring); None si todavía no existe."""
+    global _resultados
+    if _resultados is None and os.path.exists(DB_PATH):
+        _resultados = ResultadosDB(DB_PATH)
+    return _resultados
+
+def _filtros_desde_args(args):
+    filtros = {
+        "label": args.getlist("label") or None,
+        "mission": args.getlist("mission") or None,
+    }
+    for clave in ("radio_min", "radio_max", "earth_min", "earth_max"):
+        if args.get(clave) not in (None, ""):
+            filtros[clave] = float(args[clave])
+    return filtros
+
+@app.route('/catalogo/objeto/<path:object_id>', methods=['GET'])
+def catalogo_objeto(object_id):
+    """
+    Fila del catálogo CSV (features, RA/DEC, label) por object_id, con búsqueda binaria sobre el
+    índice compartido. Los resultados precalculados (predicción, earth_similarity) están en /object/<id>.
+    """
+    compartido = get_compartido()
+    if compartido is not None:
+        fila = compartido.fila_de(object_id)
+        registro = compartido.registro(fila) if fila is not None else None
+    else:
+        df = get_catalogo()
+        filas = df.index[df["object_id"] == object_id]
+        registro = None
+        if len(filas):
+            registro = {k: (None if isinstance(v, float) and np.isnan(v) else v)
+                        for k, v in df.loc[filas[0]].items()}
+    if registro is None:
+        return jsonify({"error": f"object_id no encontrado: {object_id}"}), 404
+    return jsonify(registro)
+
+@app.route('/catalogo/cono', methods=['GET'])
+def catalogo_cono():
+    """Búsqueda por cono: ?ra=&dec=&radio= (grados) + filtros opcionales"""
+    try:
+        t0 = time.perf_counter()
+        total, resultados = get_indice().cono(
+            float(request.args["ra"]), float(request.args["dec"]), float(request.args["radio"]),
+            limite=int(request.args.get("limite", 5000)),
+            **_filtros_desde_args(request.args)
+        )
+        return jsonify({"total": total, "resultados": resultados,
+                        "ms": round((time.perf_counter() - t0) * 1000, 3)})
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Parámetros inválidos: {e}"}), 400
+
+@app.route('/catalogo/caja', methods=['GET'])
+def catalogo_caja():
+    """Búsqueda por caja: ?ra_min=&ra_max=&dec_min=&dec_max= (grados) + filtros opcionales"""
+    try:
+        t0 = time.perf_counter()
+        total, resultados = get_indice().caja(
+            float(request.args["ra_min"]), float(request.args["ra_max"]),
+            float(request.args["dec_min"]), float(request.args["dec_max"]),
+            limite=int(request.args.get("limite", 5000)),
+            **_filtros_desde_args(request.args)
+        )
+        return jsonify({"total": total, "resultados": resultados,
+                        "ms": round((time.perf_counter() - t0) * 1000, 3)})
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Parámetros inválidos: {e}"}), 400
+
+@app.route('/rankings/<metrica>', methods=['GET'])
+def rankings(metrica):
+    """Top-K paginado: /rankings/earth_similarity|confianza?mission=|label=&pagina=&por_pagina="""
+    try:
+        rk = get_rankings()
+        with _lock_rankings:     # las actualizaciones mutan los heaps mientras se recorren
+            pagina = rk.consultar(
+                metrica,
+                mission=request.args.get("mission"),
+                label=request.args.get("label"),
+                pagina=request.args.get("pagina", 1),
+                por_pagina=request.args.get("por_pagina", 20),
+            )
+        return jsonify(pagina)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/rankings/actualizar', methods=['POST'])
+def rankings_actualizar():
+    """
+    Actualización incremental desde el pipeline de scoring.
+    Body: objeto o lista de objetos {object_id, [mission], [label], [earth_similarity], [confianza]}
+    """
+    try:
+        data = request.get_json(force=True)
+        items = data if isinstance(data, list) else [data]
+        rk = get_rankings()
+        with _lock_rankings:
+            for item in items:
+                item = dict(item)
+                oid = item.pop("object_id")
+                rk.actualizar(oid, mission=item.pop("mission", None), label=item.pop("label", None), **item)
+        return jsonify({"actualizados": len(items)})
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Datos inválidos: {e}"}), 400
+
+@app.route('/vecinos/<path:object_id>', methods=['GET'])
+def vecinos_objeto(object_id):
+    """k objetos más parecidos a uno del catálogo: /vecinos/<object_id>?k=10"""
+    if vecinos is None:
+        return jsonify({"error": "Índice de vecinos no cargado (genera vecinos_index.joblib con `python vecinos.py`)."}), 500
+    try:
+        resultado = vecinos.vecinos_de(object_id, k=int(request.args.get("k", 10)))
+    except ValueError as e:
+        return jsonify({"error": f"Parámetros inválidos: {e}"}), 400
+    if resultado is None:
+        return jsonify({"error": f"object_id no encontrado: {object_id}"}), 404
+    return jsonify({"object_id": object_id, "vecinos": resultado})
+
+@app.route('/vecinos', methods=['POST'])
+def vecinos_features():
+    """k objetos más parecidos a un vector de features (mismo body que /predict, + k opcional)"""
+    if vecinos is None:
+        return jsonify({"error": "Índice de vecinos no cargado (genera vecinos_index.joblib con `python vecinos.py`)."}), 500
+    try:
+        data = request.get_json(force=True)
+        return jsonify({"vecinos": vecinos.vecinos(data, k=int(data.get("k", 10)))})
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Datos inválidos: {e}"}), 400
+
+@app.route('/object/<path:object_id>', methods=['GET'])
+def objeto_resultados(object_id):
+    """
+    Predicción + earth_similarity precalculados de un objeto (clave primaria en resultados.db), tal
+    como los dejó el pipeline de scoring. Para la fila del catálogo con sus features: /catalogo/objeto/<id>.
+    """
+    db = get_resultados()
+    if db is None:
+        return jsonify({"error": "No existe resultados.db (ejecuta el scoring o `python resultados_db.py importar <json>`)."}), 500
+    registro = db.obtener(object_id)
+    if registro is None:
+        return jsonify({"error": f"object_id no encontrado: {object_id}"}), 404
+    return jsonify(registro)
+
+@app.route('/objects', methods=['GET'])
+def objetos_resultados():
+    """
+    Listado filtrado de resultados precalculados:
+    ?label=&mission= (repetibles) &earth_min=&earth_max=&prob_min=&orden=&asc=1&limite=&desplazamiento=
+    """
+    db = get_resultados()
+    if db is None:
+        return jsonify({"error": "No existe resultados.db (ejecuta el scoring o `python resultados_db.py importar <json>`)."}), 500
+    try:
+        args = request.args
+        numero = lambda clave: float(args[clave]) if args.get(clave) not in (None, "") else None
+        total, resultados = db.listar(
+            label=args.getlist("label") or None,
+            mission=args.getlist("mission") or None,
+            earth_min=numero("earth_min"),
+            earth_max=numero("earth_max"),
+            prob_min=numero("prob_min"),
+            orden=args.get("orden", "earth_similarity"),
+            descendente=args.get("asc") not in ("1", "true"),
+            limite=args.get("limite", 50),
+            desplazamiento=args.get("desplazamiento", 0),
+        )
+        return jsonify({"total": total, "resultados": resultados})
+    except ValueError as e:
+        return jsonify({"error": f"Parámetros inválidos: {e}"}), 400
+
+@app.route('/jobs', methods=['POST'])
+def crear_trabajo():
+    """
+    Encola un envío grande para clasificación + earth_similarity en segundo plano.
+    Acepta un fichero multipart `archivo` (.csv con las columnas del CSV unificado o .json con
+    una lista de registros) o un body JSON: lista de registros o {"registros": [...], "opciones": {...}}.
+    opciones.difuso: "vectorizado" (por defecto) o "exacto".
+    """
+    try:
+        if "archivo" in request.files:
+            archivo = request.files["archivo"]
+            formato = request.form.get("formato") or os.path.splitext(archivo.filename or "")[1].lstrip(".").lower()
+            opciones = {"difuso": request.form.get("difuso", "vectorizado")}
+            trabajo_id = cola.encolar(archivo, formato, opciones)
+        else:
+            data = request.get_json(force=True)
+            registros = data if isinstance(data, list) else data["registros"]
+            opciones = {} if isinstance(data, list) else data.get("opciones", {})
+            if not isinstance(registros, list):
+                raise ValueError("registros debe ser una lista")
+            trabajo_id = cola.encolar(registros, "json", opciones)
+        estado = cola.estado(trabajo_id)
+        estado["url"] = f"/jobs/{trabajo_id}"
+        return jsonify(estado), 202
+    except KeyError as e:
+        return jsonify({"error": f"Falta el campo {e}"}), 400
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Datos inválidos: {e}"}), 400
+
+@app.route('/jobs/<trabajo_id>', methods=['GET'])
+def estado_trabajo(trabajo_id):
+    """Estado y progreso de un trabajo; incluye la URL de descarga cuando está completado."""
+    estado = cola.estado(trabajo_id)
+    if estado is None:
+        return jsonify({"error": f"Trabajo no encontrado: {trabajo_id}"}), 404
+    if estado["estado"] == "completado":
+        estado["resultado"] = f"/jobs/{trabajo_id}/resultado"
+    return jsonify(estado)
+
+@app.route('/jobs/<trabajo_id>/resultado', methods=['GET'])
+def resultado_trabajo(trabajo_id):
+    """Resultado en JSON Lines: una línea {fila, object_id, prob_planeta, prediccion, earth_similarity} por registro."""
+    estado = cola.estado(trabajo_id)
+    if estado is None:
+        return jsonify({"error": f"Trabajo no encontrado: {trabajo_id}"}), 404
+    if estado["estado"] != "completado":
+        return jsonify({"error": f"El trabajo está {estado['estado']}", "progreso": estado["progreso"]}), 409
+    return send_file(cola.resultado_path(trabajo_id), mimetype="application/x-ndjson",
+                     as_attachment=True, download_name=f"{trabajo_id}.jsonl")
+
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
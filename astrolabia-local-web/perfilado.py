@@ -0,0 +1,105 @@
+# === Perfilado opcional por etapas (CSV, to_dict, pick_value, reglas difusas, compute, json.dump) ===
+#
+# Se activa con la variable de entorno ASTROLAB_PERFIL=1 o pasando --perfil al script.
+# Con ASTROLAB_PERFIL_DUMP=<ruta.prof> además se guarda un volcado de cProfile
+# (abrirlo con snakeviz, o convertirlo a flamegraph con flameprof / gprof2dot).
+# Desactivado no cuesta nada: `cronometrar` devuelve la función original sin envolver
+# y `etapa` devuelve un contexto vacío compartido.
+import atexit
+import cProfile
+import os
+import sys
+import time
+from collections import defaultdict
+
+ACTIVO = os.environ.get("ASTROLAB_PERFIL", "") not in ("", "0") or "--perfil" in sys.argv
+DUMP_PATH = os.environ.get("ASTROLAB_PERFIL_DUMP") or None
+
+_tiempos = defaultdict(float)
+_llamadas = defaultdict(int)
+_t_inicio = time.perf_counter()
+_profiler = None
+
+
+class _Nulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _Nulo()
+
+
+class _Etapa:
+    __slots__ = ("nombre", "t0")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _tiempos[self.nombre] += time.perf_counter() - self.t0
+        _llamadas[self.nombre] += 1
+        return False
+
+
+def etapa(nombre):
+    """with etapa("csv.carga"): ...  → acumula tiempo y llamadas bajo `nombre`."""
+    return _Etapa(nombre) if ACTIVO else _NULO
+
+
+def cronometrar(nombre):
+    """Decorador equivalente a `etapa` para funciones llamadas muchas veces (p.ej. pick_value)."""
+    def deco(func):
+        if not ACTIVO:
+            return func
+
+        def envuelta(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _tiempos[nombre] += time.perf_counter() - t0
+                _llamadas[nombre] += 1
+        envuelta.__name__ = func.__name__
+        envuelta.__doc__ = func.__doc__
+        return envuelta
+    return deco
+
+
+def resumen():
+    """Tabla con llamadas, tiempo total, media y % del tiempo de pared por etapa."""
+    total = time.perf_counter() - _t_inicio
+    filas = sorted(_tiempos.items(), key=lambda kv: kv[1], reverse=True)
+    lineas = [
+        "===== Perfil por etapas =====",
+        f"{'etapa':<28}{'llamadas':>10}{'total (s)':>12}{'media (ms)':>12}{'% pared':>9}",
+    ]
+    for nombre, t in filas:
+        n = _llamadas[nombre]
+        lineas.append(f"{nombre:<28}{n:>10}{t:>12.3f}{t / n * 1000:>12.3f}{t / total * 100:>8.1f}%")
+    lineas.append(f"{'(tiempo de pared)':<28}{'':>10}{total:>12.3f}")
+    return "\n".join(lineas)
+
+
+def _al_salir():
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(DUMP_PATH)
+    print(resumen())
+    if _profiler is not None:
+        print(f"Volcado cProfile: {DUMP_PATH}")
+
+
+if ACTIVO:
+    if DUMP_PATH:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    atexit.register(_al_salir)
@@ -0,0 +1,240 @@
+# === Rankings top-K (earth_similarity, confianza del clasificador) mantenidos con heaps ===
+import heapq
+import math
+
+K_DEFECTO = 100
+METRICAS = ("earth_similarity", "confianza")
+
+
+def _valido(score):
+    return score is not None and not (isinstance(score, float) and math.isnan(score))
+
+
+class _Desc:
+    """oid con el orden invertido: en el heap de reserva gana el (score, oid) mayor, como en el top."""
+    __slots__ = ("oid",)
+
+    def __init__(self, oid):
+        self.oid = oid
+
+    def __lt__(self, otro):
+        return self.oid > otro.oid
+
+    def __eq__(self, otro):
+        return self.oid == otro.oid
+
+
+class TopK:
+    """
+    Los K objetos con mayor score de una población.
+
+    - `scores` guarda el score vigente de toda la población (oid -> score).
+    - `heap` es un min-heap (score, oid) con los K mejores (`miembros`).
+    - `reserva` es un max-heap (-score, oid) con el resto de la población.
+    Las entradas obsoletas de ambos heaps se descartan de forma perezosa (una entrada vale sólo si
+    coincide con el score vigente y con el heap en el que debe estar). Toda operación —alta, subida,
+    bajada o baja de un miembro del top— cuesta O(log N) amortizado: el sustituto de un miembro que
+    baja o desaparece sale de la cima de la reserva.
+    """
+
+    def __init__(self, k=K_DEFECTO):
+        self.k = k
+        self.scores = {}
+        self.heap = []
+        self.miembros = {}
+        self.reserva = []
+        self._ordenado = None
+
+    def __len__(self):
+        return len(self.miembros)
+
+    def _minimo(self):
+        while self.heap and self.miembros.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+    def _mejor_reserva(self):
+        while self.reserva:
+            s, d = self.reserva[0]
+            if d.oid not in self.miembros and self.scores.get(d.oid) == -s:
+                return -s, d.oid
+            heapq.heappop(self.reserva)
+        return None
+
+    def _a_reserva(self, oid, score):
+        heapq.heappush(self.reserva, (-score, _Desc(oid)))
+
+    def _a_top(self, oid, score):
+        self.miembros[oid] = score
+        heapq.heappush(self.heap, (score, oid))
+
+    def _equilibrar(self):
+        """Restaura top ≥ reserva y len(top) = min(K, población) tras un cambio."""
+        while len(self.miembros) < self.k:
+            mejor = self._mejor_reserva()
+            if mejor is None:
+                break
+            heapq.heappop(self.reserva)
+            self._a_top(mejor[1], mejor[0])
+        mejor, minimo = self._mejor_reserva(), self._minimo()
+        if mejor is not None and minimo is not None and mejor > minimo:
+            heapq.heapreplace(self.reserva, (-minimo[0], _Desc(minimo[1])))
+            heapq.heapreplace(self.heap, mejor)
+            del self.miembros[minimo[1]]
+            self.miembros[mejor[1]] = mejor[0]
+
+    def actualizar(self, oid, score):
+        """Añade, cambia o (con score None/NaN) elimina el score de `oid`."""
+        self._ordenado = None
+        if not _valido(score):
+            self.scores.pop(oid, None)
+            if self.miembros.pop(oid, None) is not None:
+                self._equilibrar()
+            return
+
+        score = float(score)
+        self.scores[oid] = score
+        if oid in self.miembros:
+            self._a_top(oid, score)
+        else:
+            self._a_reserva(oid, score)
+        self._equilibrar()
+
+        # Compacta las entradas obsoletas para que los heaps no crezcan sin límite
+        if len(self.heap) > 2 * self.k:
+            self.heap = [(s, o) for o, s in self.miembros.items()]
+            heapq.heapify(self.heap)
+        if len(self.reserva) > 2 * (len(self.scores) - len(self.miembros)) + self.k:
+            self.reserva = [(-s, _Desc(o)) for o, s in self.scores.items() if o not in self.miembros]
+            heapq.heapify(self.reserva)
+
+    def ordenado(self):
+        """Top K de mayor a menor (cacheado hasta la siguiente actualización)."""
+        if self._ordenado is None:
+            self._ordenado = sorted(((s, o) for o, s in self.miembros.items()), reverse=True)
+        return self._ordenado
+
+
+class Rankings:
+    """
+    Un TopK por métrica y grupo: global, por misión y por label.
+
+    Claves: (metrica, None), (metrica, "mission:<m>"), (metrica, "label:<l>").
+    """
+
+    def __init__(self, k=K_DEFECTO):
+        self.k = k
+        self.tops = {}
+        self.grupos_obj = {}   # oid -> (mission, label)
+
+    @classmethod
+    def desde_catalogo(cls, df, model=None, k=K_DEFECTO):
+        """
+        Carga inicial desde el DataFrame de catalogo.cargar_catalogo().
+        Si hay modelo, la confianza es P(PLANET) calculada en un único predict_proba.
+        """
+        from catalogo import FEATURES
+
+        rk = cls(k=k)
+        confianza = [None] * len(df)
+        if model is not None and hasattr(model, "predict_proba"):
+            confianza = model.predict_proba(df[FEATURES])[:, 1]
+
+        for oid, mission, label, earth, conf in zip(
+            df["object_id"], df["mission"], df["label"], df["earth_similarity"], confianza
+        ):
+            rk.actualizar(oid, mission=mission, label=label,
+                          earth_similarity=earth, confianza=conf)
+        return rk
+
+    @staticmethod
+    def _grupos(mission, label):
+        grupos = [None]
+        if mission is not None:
+            grupos.append(f"mission:{mission}")
+        if label is not None:
+            grupos.append(f"label:{label}")
+        return grupos
+
+    def _top(self, metrica, grupo):
+        top = self.tops.get((metrica, grupo))
+        if top is None:
+            top = self.tops[(metrica, grupo)] = TopK(self.k)
+        return top
+
+    def actualizar(self, oid, mission=None, label=None, **scores):
+        """
+        Alta o cambio incremental de un objeto. `scores` admite las claves de METRICAS;
+        las métricas que no se pasan conservan su valor anterior.
+        """
+        desconocidas = set(scores) - set(METRICAS)
+        if desconocidas:
+            raise ValueError(f"Métricas desconocidas: {sorted(desconocidas)}")
+
+        oid = str(oid)
+        if label is not None:
+            label = str(label).upper()   # consultar() compara en mayúsculas
+        mission_ant, label_ant = self.grupos_obj.get(oid, (None, None))
+        mission = mission if mission is not None else mission_ant
+        label = label if label is not None else label_ant
+        self.grupos_obj[oid] = (mission, label)
+
+        nuevos = self._grupos(mission, label)
+        viejos = [g for g in self._grupos(mission_ant, label_ant) if g not in nuevos]
+
+        for metrica in METRICAS:
+            global_ = self._top(metrica, None)
+            valor = scores[metrica] if metrica in scores else global_.scores.get(oid)
+            for g in viejos:
+                self._top(metrica, g).actualizar(oid, None)
+            for g in nuevos:
+                self._top(metrica, g).actualizar(oid, valor)
+
+    def sincronizar(self, filas):
+        """
+        Aplica filas de resultados.db (ResultadosDB.cambios_desde): así los rankings recogen lo que
+        escriben los scripts de scoring y la cola de trabajos. Un score NULL (p.ej. `resultados_db.py
+        clasificar` sólo escribe prob_planeta) conserva el valor que ya tenía el ranking.
+        """
+        n = 0
+        for fila in filas:
+            scores = {}
+            if fila["earth_similarity"] is not None:
+                scores["earth_similarity"] = fila["earth_similarity"]
+            if fila["prob_planeta"] is not None:
+                scores["confianza"] = fila["prob_planeta"]
+            self.actualizar(fila["object_id"], mission=fila["mission"], label=fila["label"], **scores)
+            n += 1
+        return n
+
+    def consultar(self, metrica, mission=None, label=None, pagina=1, por_pagina=20):
+        """Página del ranking (1-indexada). Coste O(por_pagina), independiente del catálogo."""
+        if metrica not in METRICAS:
+            raise ValueError(f"Métrica desconocida: {metrica}")
+        if mission is not None and label is not None:
+            raise ValueError("Filtra por mission o por label, no por ambos")
+
+        grupo = None
+        if mission is not None:
+            grupo = f"mission:{mission}"
+        elif label is not None:
+            grupo = f"label:{str(label).upper()}"
+
+        top = self.tops.get((metrica, grupo))
+        ordenado = top.ordenado() if top is not None else []
+
+        pagina = max(int(pagina), 1)
+        por_pagina = min(max(int(por_pagina), 1), self.k)
+        inicio = (pagina - 1) * por_pagina
+        items = [
+            {"rank": inicio + i + 1, "object_id": oid, metrica: round(score, 4)}
+            for i, (score, oid) in enumerate(ordenado[inicio:inicio + por_pagina])
+        ]
+        return {
+            "metrica": metrica,
+            "grupo": grupo,
+            "pagina": pagina,
+            "por_pagina": por_pagina,
+            "total": len(ordenado),
+            "items": items,
+        }
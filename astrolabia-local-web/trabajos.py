@@ -0,0 +1,336 @@
+# === Cola local de trabajos de scoring (clasificador + earth_similarity) para envíos grandes ===
+#
+#   python trabajos.py worker [n_hilos]     # workers en un proceso aparte (además de los de la API)
+#
+# Sin broker externo: la cola es una tabla SQLite (trabajos/cola.db) y cada trabajo guarda su
+# entrada y su resultado en trabajos/<id>/. Los workers reclaman trabajos con una transacción
+# BEGIN IMMEDIATE, así que pueden convivir varios procesos. El resultado se escribe por bloques
+# en resultado.jsonl; tras cada bloque se guardan `procesados` y el offset en bytes del fichero
+# (checkpoint). Mientras procesa, un hilo aparte renueva el latido cada LATIDO_INTERVALO s (aunque
+# un bloque tarde, p.ej. con difuso="exacto"). Si un worker muere, otro reclama el trabajo cuando su
+# latido caduca, recorta el fichero al último offset confirmado y sigue desde ahí; el worker
+# anterior comprueba que el trabajo sigue siendo suyo antes de escribir cada bloque.
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from catalogo import BASE_DIR, FEATURES, normalize_label
+
+TRABAJOS_DIR = os.path.join(BASE_DIR, "trabajos")
+
+TAMANO_BLOQUE = 2000
+LATIDO_CADUCADO = 120      # s sin latido → el trabajo se considera abandonado
+LATIDO_INTERVALO = 15      # s entre latidos del trabajo en curso
+ESPERA_VACIA = 1.0         # s entre sondeos cuando no hay trabajos
+CLASES = ("FALSE POSITIVE", "PLANET")
+
+# Entradas difusas ← columnas del CSV, con los mismos defaults que calcularSimilitud.py
+MAP_DIFUSO = [
+    ("radius",  "pl_radio",          1.0),
+    ("teq",     "pl_temperatura_eq", 290.0),
+    ("insol",   "insolacion",        1.0),
+    ("period",  "periodo_orbital",   50.0),
+    ("st_teff", "st_temperatura",    5777.0),
+    ("st_rad",  "st_radio",          1.0),
+    ("st_logg", "st_gravedad",       4.4),
+]
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id          TEXT PRIMARY KEY,
+    estado      TEXT NOT NULL,          -- pendiente | en_curso | completado | error
+    formato     TEXT NOT NULL,          -- json | csv
+    opciones    TEXT NOT NULL DEFAULT '{}',
+    total       INTEGER,
+    procesados  INTEGER NOT NULL DEFAULT 0,
+    offset      INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    worker      TEXT,
+    latido      REAL,
+    creado      TEXT NOT NULL,
+    actualizado TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos(estado, creado);
+"""
+
+
+def _ahora():
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+# ---------- scoring de un bloque ----------
+def puntuar_bloque(df, model, difuso="vectorizado"):
+    """
+    DataFrame con columnas del CSV unificado → lista de dicts
+    {fila, object_id, prob_planeta, prediccion, earth_similarity}.
+    Las features que falten van como NaN (XGBoost usa la rama por defecto). El score difuso
+    se calcula como en calcularSimilitud.py (defaults, 1 decimal) salvo para FALSE POSITIVE.
+    """
+    n = len(df)
+    X = np.column_stack([pd.to_numeric(df[f], errors="coerce").to_numpy(dtype=float)
+                         if f in df.columns else np.full(n, np.nan) for f in FEATURES])
+    proba = model.predict_proba(X)[:, 1] if model is not None else np.full(n, np.nan)
+
+    entradas = np.column_stack([
+        pd.to_numeric(df[col], errors="coerce").fillna(defecto).to_numpy(dtype=float)
+        if col in df.columns else np.full(n, defecto)
+        for _, col, defecto in MAP_DIFUSO
+    ])
+    if difuso == "exacto":
+        from surrogado_difuso import puntuar_exacto
+        scores = puntuar_exacto(entradas)
+    else:
+        from barrido_difuso import obtener_sistema_vectorizado
+        scores = obtener_sistema_vectorizado().puntuar(entradas)
+
+    labels = [normalize_label(v) for v in df["label"]] if "label" in df.columns else [None] * n
+    ids = df["object_id"].astype(str).tolist() if "object_id" in df.columns else [None] * n
+
+    salida = []
+    for i in range(n):
+        earth = None if labels[i] == "FALSE POSITIVE" or np.isnan(scores[i]) else round(float(scores[i]), 1)
+        p = None if np.isnan(proba[i]) else float(proba[i])
+        salida.append({
+            "fila": int(df.index[i]),
+            "object_id": ids[i],
+            "prob_planeta": p,
+            "prediccion": None if p is None else CLASES[int(p >= 0.5)],
+            "earth_similarity": earth,
+        })
+    return salida
+
+
+def _bloques(path, formato, desde):
+    """Itera DataFrames de TAMANO_BLOQUE filas empezando en la fila `desde` (índice = nº de fila)."""
+    if formato == "csv":
+        lector = pd.read_csv(path, chunksize=TAMANO_BLOQUE, low_memory=False,
+                             skiprows=range(1, desde + 1))
+        inicio = desde
+        for df in lector:
+            df.index = range(inicio, inicio + len(df))
+            inicio += len(df)
+            yield df
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            registros = json.load(f)
+        for i in range(desde, len(registros), TAMANO_BLOQUE):
+            df = pd.DataFrame.from_records(registros[i:i + TAMANO_BLOQUE])
+            df.index = range(i, i + len(df))
+            yield df
+
+
+def _contar_filas(path, formato):
+    if formato == "csv":
+        with open(path, "rb") as f:
+            return max(sum(1 for _ in f) - 1, 0)
+    with open(path, "r", encoding="utf-8") as f:
+        return len(json.load(f))
+
+
+# ---------- cola ----------
+class ColaTrabajos:
+    """Cola en SQLite + pool de hilos worker. Una conexión por hilo."""
+
+    def __init__(self, directorio=TRABAJOS_DIR, model=None):
+        self.directorio = directorio
+        self.path = os.path.join(directorio, "cola.db")
+        self.model = model
+        self._local = threading.local()
+        self._parar = threading.Event()
+        self._hilos = []
+        os.makedirs(directorio, exist_ok=True)
+        self.conexion().executescript(ESQUEMA)
+
+    def conexion(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=30, isolation_level=None)   # transacciones explícitas
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            self._local.con = con
+        return con
+
+    def carpeta(self, trabajo_id):
+        return os.path.join(self.directorio, trabajo_id)
+
+    def resultado_path(self, trabajo_id):
+        return os.path.join(self.carpeta(trabajo_id), "resultado.jsonl")
+
+    # ---------- envío y consulta ----------
+    def encolar(self, origen, formato, opciones=None):
+        """
+        Guarda la entrada y crea el trabajo. `origen` es una lista de registros (formato json)
+        o un objeto con .save(path) / ruta a fichero (csv o json). Devuelve el id.
+        """
+        if formato not in ("json", "csv"):
+            raise ValueError("formato debe ser json o csv")
+        if (opciones or {}).get("difuso", "vectorizado") not in ("vectorizado", "exacto"):
+            raise ValueError("opciones.difuso debe ser vectorizado o exacto")
+        trabajo_id = uuid.uuid4().hex
+        carpeta = self.carpeta(trabajo_id)
+        os.makedirs(carpeta)
+        entrada = os.path.join(carpeta, f"entrada.{formato}")
+        try:
+            if isinstance(origen, list):
+                with open(entrada, "w", encoding="utf-8") as f:
+                    json.dump(origen, f, ensure_ascii=False)
+            elif hasattr(origen, "save"):
+                origen.save(entrada)
+            else:
+                shutil.copyfile(origen, entrada)
+            total = _contar_filas(entrada, formato)
+        except Exception:
+            shutil.rmtree(carpeta, ignore_errors=True)
+            raise
+        self.conexion().execute(
+            "INSERT INTO trabajos (id, estado, formato, opciones, total, creado, actualizado) "
+            "VALUES (?, 'pendiente', ?, ?, ?, ?, ?)",
+            (trabajo_id, formato, json.dumps(opciones or {}), total, _ahora(), _ahora()))
+        return trabajo_id
+
+    def estado(self, trabajo_id):
+        row = self.conexion().execute("SELECT * FROM trabajos WHERE id = ?", (trabajo_id,)).fetchone()
+        if row is None:
+            return None
+        total, hechos = row["total"], row["procesados"]
+        return {
+            "id": row["id"],
+            "estado": row["estado"],
+            "total": total,
+            "procesados": hechos,
+            "progreso": round(hechos / total, 4) if total else (1.0 if row["estado"] == "completado" else 0.0),
+            "opciones": json.loads(row["opciones"]),
+            "error": row["error"],
+            "creado": row["creado"],
+            "actualizado": row["actualizado"],
+        }
+
+    # ---------- worker ----------
+    def _reclamar(self, worker):
+        """Toma el trabajo pendiente más antiguo (o uno abandonado) de forma atómica entre procesos."""
+        con = self.conexion()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            caducado = time.time() - LATIDO_CADUCADO
+            row = con.execute(
+                "SELECT * FROM trabajos WHERE estado = 'pendiente' "
+                "OR (estado = 'en_curso' AND latido < ?) ORDER BY creado LIMIT 1", (caducado,)).fetchone()
+            if row is not None:
+                con.execute("UPDATE trabajos SET estado = 'en_curso', worker = ?, latido = ?, actualizado = ? "
+                            "WHERE id = ?", (worker, time.time(), _ahora(), row["id"]))
+            con.execute("COMMIT")
+            return row
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+
+    def _es_mio(self, trabajo_id, worker):
+        row = self.conexion().execute("SELECT 1 FROM trabajos WHERE id = ? AND worker = ? AND estado = 'en_curso'",
+                                      (trabajo_id, worker)).fetchone()
+        return row is not None
+
+    def _latir(self, trabajo_id, worker, fin, perdido):
+        """Hilo de latido: renueva `latido` hasta que `fin` se active o el trabajo deje de ser suyo."""
+        while not fin.wait(LATIDO_INTERVALO):
+            try:
+                cur = self.conexion().execute(
+                    "UPDATE trabajos SET latido = ? WHERE id = ? AND worker = ? AND estado = 'en_curso'",
+                    (time.time(), trabajo_id, worker))
+                if cur.rowcount == 0:
+                    perdido.set()
+                    return
+            except sqlite3.Error:
+                traceback.print_exc()      # se reintenta en el siguiente latido
+
+    def procesar(self, row, worker):
+        """Procesa (o reanuda) un trabajo reclamado, bloque a bloque con checkpoint."""
+        con = self.conexion()
+        trabajo_id = row["id"]
+        opciones = json.loads(row["opciones"])
+        entrada = os.path.join(self.carpeta(trabajo_id), f"entrada.{row['formato']}")
+        procesados, offset = row["procesados"], row["offset"]
+        fin, perdido = threading.Event(), threading.Event()
+        latido = threading.Thread(target=self._latir, args=(trabajo_id, worker, fin, perdido),
+                                  daemon=True, name=f"latido-{worker}")
+        latido.start()
+        try:
+            with open(self.resultado_path(trabajo_id), "ab") as f:
+                f.truncate(offset)      # descarta lo escrito tras el último checkpoint
+                for df in _bloques(entrada, row["formato"], procesados):
+                    if self._parar.is_set():
+                        return
+                    salida = puntuar_bloque(df, self.model, opciones.get("difuso", "vectorizado"))
+                    if perdido.is_set() or not self._es_mio(trabajo_id, worker):
+                        return      # otro worker lo reclamó mientras se puntuaba: no tocar el fichero
+                    f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in salida).encode("utf-8"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                    procesados += len(df)
+                    offset = f.tell()
+                    cur = con.execute("UPDATE trabajos SET procesados = ?, offset = ?, latido = ?, actualizado = ? "
+                                      "WHERE id = ? AND worker = ?",
+                                      (procesados, offset, time.time(), _ahora(), trabajo_id, worker))
+                    if cur.rowcount == 0:
+                        return      # otro worker lo reclamó (latido caducado): deja de escribir
+            con.execute("UPDATE trabajos SET estado = 'completado', total = ?, actualizado = ? "
+                        "WHERE id = ? AND worker = ?", (procesados, _ahora(), trabajo_id, worker))
+        except Exception as e:
+            traceback.print_exc()
+            con.execute("UPDATE trabajos SET estado = 'error', error = ?, actualizado = ? WHERE id = ? AND worker = ?",
+                        (f"{type(e).__name__}: {e}", _ahora(), trabajo_id, worker))
+        finally:
+            fin.set()
+            latido.join()
+
+    def _bucle(self, worker):
+        while not self._parar.is_set():
+            try:
+                row = self._reclamar(worker)
+                if row is None:
+                    self._parar.wait(ESPERA_VACIA)
+                    continue
+                self.procesar(row, worker)
+            except Exception:
+                # p.ej. "database is locked" o un fallo al marcar el error: el hilo sigue vivo
+                print(f"✘ Worker {worker}: error en el bucle de trabajos", file=sys.stderr)
+                traceback.print_exc()
+                self._parar.wait(ESPERA_VACIA)
+
+    def iniciar(self, n_hilos=2):
+        """Arranca n hilos worker (daemon) en este proceso."""
+        for _ in range(n_hilos):
+            worker = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+            hilo = threading.Thread(target=self._bucle, args=(worker,), daemon=True, name=f"trabajos-{worker}")
+            hilo.start()
+            self._hilos.append(hilo)
+        return self
+
+    def parar(self, timeout=None):
+        self._parar.set()
+        for hilo in self._hilos:
+            hilo.join(timeout)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "worker":
+        raise SystemExit("Uso: python trabajos.py worker [n_hilos]")
+    import joblib
+
+    cola = ColaTrabajos(model=joblib.load(os.path.join(BASE_DIR, "model.pkl")))
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    cola.iniciar(n)
+    print(f"✔ {n} workers escuchando en {cola.path} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        cola.parar(timeout=5)
@@ -0,0 +1,129 @@
+# === "Planetas similares": k vecinos más cercanos sobre las 9 features del modelo ===
+# Las features se pasan a escala log y se estandarizan; el KD-tree se construye offline
+# (python vecinos.py) y el servicio lo abre con joblib en modo mmap (sin copiarlo a RAM).
+import os
+import time
+
+import joblib
+import numpy as np
+from sklearn.neighbors import KDTree
+
+from catalogo import BASE_DIR, FEATURES, cargar_catalogo
+
+INDICE_PATH = os.path.join(BASE_DIR, "vecinos_index.joblib")
+VERSION = 1
+
+# st_gravedad ya es log g → no se vuelve a aplicar log
+SIN_LOG = {"st_gravedad"}
+K_DEFECTO = 10
+K_MAX = 100
+
+
+def transformar(X):
+    """Matriz (n, 9) en orden FEATURES → log10(1 + max(x, 0)) salvo SIN_LOG."""
+    X = np.array(X, dtype=float, copy=True)
+    for j, col in enumerate(FEATURES):
+        if col not in SIN_LOG:
+            X[:, j] = np.log10(1.0 + np.clip(X[:, j], 0.0, None))
+    return X
+
+
+def construir(df, leaf_size=40):
+    """
+    Devuelve el dict persistible: KD-tree, ids y parámetros de la estandarización.
+    Los NaN se imputan con la mediana (en escala log) de cada columna.
+    """
+    ids = np.array(df["object_id"].astype(str).tolist())
+    Xl = transformar(df[FEATURES].to_numpy(dtype=float))
+    mediana = np.nanmedian(Xl, axis=0)
+    Xl = np.where(np.isnan(Xl), mediana, Xl)
+    media = Xl.mean(axis=0)
+    desv = Xl.std(axis=0)
+    desv[desv == 0] = 1.0
+    Z = (Xl - media) / desv
+
+    return {
+        "version": VERSION,
+        "features": list(FEATURES),
+        "mediana": mediana,
+        "media": media,
+        "desv": desv,
+        # ids como array de ancho fijo (+ su orden) para que también queden mapeados en memoria
+        "ids": ids,
+        "orden_ids": np.argsort(ids, kind="stable"),
+        "tree": KDTree(Z, leaf_size=leaf_size),
+    }
+
+
+def guardar(indice, path=INDICE_PATH):
+    joblib.dump(indice, path)
+
+
+class IndiceVecinos:
+    """Índice kNN ya construido, cargado con mmap_mode='r' (compartido entre procesos vía page cache)."""
+
+    def __init__(self, indice):
+        if indice.get("version") != VERSION or indice.get("features") != list(FEATURES):
+            raise ValueError("Índice de vecinos incompatible: vuelve a generarlo con `python vecinos.py`")
+        self.tree = indice["tree"]
+        self.ids = indice["ids"]
+        self.orden_ids = indice["orden_ids"]
+        self.mediana = np.asarray(indice["mediana"])
+        self.media = np.asarray(indice["media"])
+        self.desv = np.asarray(indice["desv"])
+
+    @classmethod
+    def cargar(cls, path=INDICE_PATH):
+        return cls(joblib.load(path, mmap_mode="r"))
+
+    def _estandarizar(self, X):
+        Xl = transformar(np.atleast_2d(X))
+        Xl = np.where(np.isnan(Xl), self.mediana, Xl)
+        return (Xl - self.media) / self.desv
+
+    def fila_de(self, object_id):
+        """object_id → posición en el índice (búsqueda binaria sobre orden_ids); None si no existe."""
+        object_id = str(object_id)
+        pos = np.searchsorted(self.ids, object_id, sorter=self.orden_ids)
+        if pos < len(self.ids) and self.ids[self.orden_ids[pos]] == object_id:
+            return int(self.orden_ids[pos])
+        return None
+
+    def _consultar(self, z, k, excluir=None):
+        k = min(max(int(k), 1), K_MAX)
+        extra = 1 if excluir is not None else 0
+        dist, idx = self.tree.query(np.atleast_2d(z), k=k + extra)
+        out = []
+        for d, i in zip(dist[0], idx[0]):
+            oid = str(self.ids[i])
+            if oid == excluir:
+                continue
+            out.append({"object_id": oid, "distancia": round(float(d), 6)})
+        return out[:k]
+
+    def vecinos(self, valores, k=K_DEFECTO):
+        """
+        valores: dict {feature: valor} (faltantes → mediana) o secuencia en orden FEATURES.
+        Devuelve [{"object_id", "distancia"}] de los k más cercanos.
+        """
+        if isinstance(valores, dict):
+            valores = [valores.get(f) for f in FEATURES]
+        x = np.array([np.nan if v is None else float(v) for v in valores], dtype=float)
+        return self._consultar(self._estandarizar(x), k)
+
+    def vecinos_de(self, object_id, k=K_DEFECTO):
+        """Vecinos de un objeto del catálogo (sin incluirse a sí mismo); None si no existe."""
+        i = self.fila_de(object_id)
+        if i is None:
+            return None
+        # get_arrays()[0] son los datos ya estandarizados, en el orden original
+        z = self.tree.get_arrays()[0][i]
+        return self._consultar(z, k, excluir=str(object_id))
+
+
+if __name__ == "__main__":
+    t0 = time.time()
+    indice = construir(cargar_catalogo())
+    guardar(indice)
+    print(f"✔ Índice de vecinos: {len(indice['ids'])} objetos → {INDICE_PATH}")
+    print(f"⏱ Tiempo total: {time.time() - t0:.1f} s")
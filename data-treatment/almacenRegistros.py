@@ -0,0 +1,352 @@
+# === Almacén columnar de registros (sustituye a la lista de dicts del JSON y al df_dict del CSV) ===
+#
+# Cada campo se guarda en un único array de NumPy en vez de repetirse en cada dict:
+#   num   float64 + máscara de nulos + máscara de enteros (un 1 vuelve como 1 y un 1.0 como 1.0)
+#   cat   códigos int16 + lista de categorías (label, mission y cualquier texto repetido)
+#   txt   array de texto de NumPy + máscara de nulos (object_id y textos casi únicos)
+#   obj   array de objetos (bools, listas… lo que no encaja en lo anterior)
+# El índice por object_id es un argsort + searchsorted, sin dict por fila. El orden de claves de
+# cada registro (su "firma") se guarda como un código por fila sobre una tabla de firmas distintas,
+# así volcar_json reproduce byte a byte lo que escribía json.dump sobre la lista de dicts.
+#
+# La API es la misma que usaban los scripts sobre dicts:
+#   for rec in almacen: rec.get("label"); rec["earth_similarity"] = 87.3; "pl_radio" in rec
+#   almacen.get(oid) → registro o None       (igual que df_dict.get(oid))
+# Los dicts sólo se crean al exportar (volcar_json), y de uno en uno.
+import json
+import os
+
+import numpy as np
+
+_FALTA = object()          # la clave no existe en el registro (distinto de valor None)
+MAX_CATEGORIAS = 32767     # cabe en int16 con -1 para None
+
+
+class _Columna:
+    __slots__ = ("tipo", "datos", "nulos", "categorias", "codigo_de", "entero")
+
+    def __init__(self, tipo, datos, nulos=None, categorias=None, entero=None):
+        self.tipo = tipo
+        self.datos = datos
+        self.nulos = nulos
+        self.categorias = categorias
+        self.codigo_de = {c: k for k, c in enumerate(categorias)} if categorias is not None else None
+        self.entero = entero
+
+    @classmethod
+    def desde_valores(cls, valores):
+        """Lista de valores Python (None permitido, _FALTA = ausente) → columna con el tipo más compacto."""
+        utiles = [v for v in valores if v is not None and v is not _FALTA]
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in utiles) and \
+                all(abs(v) < 2 ** 53 for v in utiles if isinstance(v, int)):
+            nulos = np.array([v is None or v is _FALTA for v in valores], dtype=bool)
+            datos = np.array([np.nan if v is None or v is _FALTA else v for v in valores], dtype=np.float64)
+            entero = np.array([isinstance(v, int) for v in valores], dtype=bool)
+            return cls("num", datos, nulos=nulos, entero=entero)
+        if all(isinstance(v, str) for v in utiles):
+            distintos = sorted(set(utiles))
+            if len(distintos) <= MAX_CATEGORIAS and len(distintos) * 2 <= len(utiles):
+                codigo_de = {c: k for k, c in enumerate(distintos)}
+                datos = np.array([codigo_de.get(v, -1) if isinstance(v, str) else -1 for v in valores],
+                                 dtype=np.int16)
+                return cls("cat", datos, categorias=distintos)
+            nulos = np.array([not isinstance(v, str) for v in valores], dtype=bool)
+            datos = np.array([v if isinstance(v, str) else "" for v in valores], dtype=str)
+            return cls("txt", datos, nulos=nulos)
+        datos = np.empty(len(valores), dtype=object)
+        datos[:] = [None if v is _FALTA else v for v in valores]
+        return cls("obj", datos)
+
+    @classmethod
+    def vacia(cls, n):
+        return cls("num", np.full(n, np.nan, dtype=np.float64), nulos=np.ones(n, dtype=bool),
+                   entero=np.zeros(n, dtype=bool))
+
+    def leer(self, i):
+        if self.tipo == "num":
+            if self.nulos[i]:
+                return None
+            v = self.datos[i]
+            return int(v) if self.entero[i] else float(v)   # NaN del JSON original se conserva
+        if self.tipo == "cat":
+            k = self.datos[i]
+            return None if k < 0 else self.categorias[k]
+        if self.tipo == "txt":
+            return None if self.nulos[i] else str(self.datos[i])
+        return self.datos[i]
+
+    def escribir(self, i, v):
+        """Escribe en su sitio si el tipo lo admite; si no, devuelve la columna convertida a 'obj'."""
+        if v is None:
+            if self.tipo == "num":
+                self.datos[i] = np.nan
+                self.nulos[i] = True
+            elif self.tipo == "cat":
+                self.datos[i] = -1
+            elif self.tipo == "txt":
+                self.nulos[i] = True
+            else:
+                self.datos[i] = None
+            return self
+        if self.tipo == "num" and isinstance(v, (int, float, np.integer, np.floating)) and \
+                not isinstance(v, bool) and not (isinstance(v, (int, np.integer)) and abs(int(v)) >= 2 ** 53):
+            self.datos[i] = v
+            self.nulos[i] = False
+            self.entero[i] = isinstance(v, (int, np.integer))
+            return self
+        if self.tipo == "cat" and isinstance(v, str):
+            k = self.codigo_de.get(v)
+            if k is None and len(self.categorias) < MAX_CATEGORIAS:
+                k = self.codigo_de[v] = len(self.categorias)
+                self.categorias.append(v)
+            if k is not None:
+                self.datos[i] = k
+                return self
+        if self.tipo == "txt" and isinstance(v, str):
+            if len(v) > self.datos.dtype.itemsize // 4:
+                self.datos = self.datos.astype(f"<U{len(v)}")
+            self.datos[i] = v
+            self.nulos[i] = False
+            return self
+        if self.tipo == "obj":
+            self.datos[i] = v
+            return self
+        obj = np.empty(len(self.datos), dtype=object)
+        obj[:] = [self.leer(j) for j in range(len(self.datos))]
+        obj[i] = v
+        return _Columna("obj", obj)
+
+
+class Registro:
+    """Vista de una fila del almacén con la interfaz de dict que usaban los scripts."""
+    __slots__ = ("_almacen", "_i")
+
+    def __init__(self, almacen, i):
+        self._almacen = almacen
+        self._i = i
+
+    def get(self, clave, default=None):
+        return self._almacen._leer(self._i, clave, default)
+
+    def __getitem__(self, clave):
+        v = self._almacen._leer(self._i, clave, _FALTA)
+        if v is _FALTA:
+            raise KeyError(clave)
+        return v
+
+    def __setitem__(self, clave, valor):
+        self._almacen._escribir(self._i, clave, valor)
+
+    def __contains__(self, clave):
+        return self._almacen._presente(self._i, clave)
+
+    def a_dict(self):
+        return self._almacen.a_dict(self._i)
+
+    def __repr__(self):
+        return f"Registro({self.a_dict()!r})"
+
+
+class AlmacenRegistros:
+    """Registros en columnas de NumPy con índice por object_id."""
+
+    def __init__(self, columnas, firmas, firma, n, clave_id="object_id"):
+        self.columnas = columnas        # dict nombre → _Columna (en orden de aparición)
+        self.firmas = firmas            # lista de tuplas de claves distintas (orden de cada registro)
+        self.firma = firma              # int32 por fila → índice en `firmas`
+        self.n = n
+        self.clave_id = clave_id
+        self._conjuntos = [frozenset(f) for f in firmas]
+        self._codigo_firma = {f: k for k, f in enumerate(firmas)}
+        self._indexar()
+
+    # ---------- construcción ----------
+    @classmethod
+    def desde_registros(cls, registros, clave_id="object_id"):
+        """
+        Lista de dicts (p.ej. json.load) → almacén. La lista se vacía durante la conversión
+        para que los dicts se liberen a medida que se pasan a columnas.
+        """
+        n = len(registros)
+        valores = {}
+        firmas, codigo_firma = [], {}
+        firma = np.empty(n, dtype=np.int32)
+        registros.reverse()
+        i = 0
+        while registros:
+            rec = registros.pop()
+            claves = tuple(rec)
+            k = codigo_firma.get(claves)
+            if k is None:
+                k = codigo_firma[claves] = len(firmas)
+                firmas.append(claves)
+            firma[i] = k
+            for clave, v in rec.items():
+                col = valores.get(clave)
+                if col is None:
+                    col = valores[clave] = [_FALTA] * i
+                col.append(v)
+            i += 1
+            for col in valores.values():
+                if len(col) < i:
+                    col.append(_FALTA)
+
+        columnas = {}
+        for clave in list(valores):
+            columnas[clave] = _Columna.desde_valores(valores.pop(clave))
+        return cls(columnas, firmas, firma, n, clave_id)
+
+    @classmethod
+    def desde_json(cls, path, clave_id="object_id"):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.desde_registros(json.load(f), clave_id)
+
+    @classmethod
+    def desde_dataframe(cls, df, clave_id="object_id"):
+        """DataFrame (p.ej. el CSV ya deduplicado) → almacén, sin pasar por to_dict."""
+        columnas = {}
+        n = len(df)
+        for col in df.columns:
+            serie = df[col]
+            if serie.dtype.kind in "fiu":
+                datos = serie.to_numpy(dtype=np.float64, copy=True)
+                columnas[col] = _Columna("num", datos, nulos=np.isnan(datos),
+                                         entero=np.full(n, serie.dtype.kind in "iu"))
+            else:
+                columnas[col] = _Columna.desde_valores(
+                    [None if (isinstance(v, float) and v != v) else v for v in serie.tolist()]
+                )
+        return cls(columnas, [tuple(df.columns)], np.zeros(n, dtype=np.int32), n, clave_id)
+
+    def _indexar(self):
+        col = self.columnas.get(self.clave_id)
+        if col is None:
+            self._ids = self._orden = None
+            return
+        ids = np.array(["" if v is None else str(v) for v in (col.leer(i) for i in range(self.n))], dtype=str)
+        self._orden = np.argsort(ids, kind="stable")   # ante duplicados gana la primera fila
+        self._ids = ids[self._orden]
+
+    # ---------- acceso por fila ----------
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield Registro(self, i)
+
+    def __getitem__(self, i):
+        if not -self.n <= i < self.n:
+            raise IndexError(i)
+        return Registro(self, i % self.n)
+
+    def filas_de(self, object_id):
+        """object_id → posiciones de todas sus apariciones, en orden."""
+        if self._ids is None:
+            raise KeyError(f"El almacén no tiene columna {self.clave_id!r}")
+        oid = str(object_id)
+        ini = int(np.searchsorted(self._ids, oid, side="left"))
+        fin = int(np.searchsorted(self._ids, oid, side="right"))
+        return self._orden[ini:fin].tolist()
+
+    def fila_de(self, object_id):
+        """object_id → posición (primera aparición) o None."""
+        filas = self.filas_de(object_id)
+        return filas[0] if filas else None
+
+    def get(self, object_id, default=None):
+        """Igual que df_dict.get(oid): registro con ese object_id o `default`."""
+        i = self.fila_de(object_id)
+        return default if i is None else Registro(self, i)
+
+    def __contains__(self, object_id):
+        return self.fila_de(object_id) is not None
+
+    def _presente(self, i, clave):
+        return clave in self._conjuntos[self.firma[i]]
+
+    def _fijar_firma(self, i, claves):
+        k = self._codigo_firma.get(claves)
+        if k is None:
+            k = self._codigo_firma[claves] = len(self.firmas)
+            self.firmas.append(claves)
+            self._conjuntos.append(frozenset(claves))
+        self.firma[i] = k
+
+    def _leer(self, i, clave, default):
+        if not self._presente(i, clave):
+            return default
+        return self.columnas[clave].leer(i)
+
+    def _escribir(self, i, clave, valor, reindexar=True):
+        col = self.columnas.get(clave)
+        if col is None:
+            col = self.columnas[clave] = _Columna.vacia(self.n)
+        self.columnas[clave] = col.escribir(i, valor)
+        if not self._presente(i, clave):   # como en un dict: clave nueva al final
+            self._fijar_firma(i, self.firmas[self.firma[i]] + (clave,))
+        if clave == self.clave_id and reindexar:
+            self._indexar()
+
+    # ---------- acceso por columna ----------
+    def columna(self, clave):
+        """Array de la columna: float64 con NaN en 'num'; valores decodificados en el resto."""
+        col = self.columnas[clave]
+        if col.tipo == "num":
+            return col.datos
+        return np.array([col.leer(i) for i in range(self.n)], dtype=object)
+
+    def actualizar_desde(self, otro):
+        """
+        Sustituye cada fila por el registro de `otro` (p.ej. el TMP de una ejecución anterior) con
+        el mismo object_id, como hacían los scripts con {oid: rec}: el registro entero, con su orden
+        de claves, y ante object_id repetidos en `otro` gana la última aparición.
+        Devuelve cuántas filas se actualizaron.
+        """
+        ultima = {}
+        for j in range(otro.n):
+            ultima[str(otro.columnas[otro.clave_id].leer(j))] = j
+        n = 0
+        for oid, j in ultima.items():
+            claves = otro.firmas[otro.firma[j]]
+            for i in self.filas_de(oid):
+                self._fijar_firma(i, ())
+                for clave in claves:
+                    # el object_id escrito es el mismo (como str): el índice sigue valiendo hasta el final
+                    self._escribir(i, clave, otro.columnas[clave].leer(j), reindexar=False)
+                n += 1
+        self._indexar()
+        return n
+
+    # ---------- exportación ----------
+    def a_dict(self, i):
+        return {clave: self.columnas[clave].leer(i) for clave in self.firmas[self.firma[i]]}
+
+    def volcar_json(self, path, indent=2):
+        """
+        Escribe el mismo JSON que json.dump(lista_de_dicts, indent=2), creando un dict por
+        registro en vez de toda la lista a la vez. Escritura atómica (tmp + replace).
+        """
+        tmp = path + ".parcial"
+        sangria = " " * indent
+        with open(tmp, "w", encoding="utf-8") as f:
+            if self.n == 0:
+                f.write("[]")
+            else:
+                f.write("[\n")
+                for i in range(self.n):
+                    texto = json.dumps(self.a_dict(i), ensure_ascii=False, indent=indent)
+                    f.write(sangria + texto.replace("\n", "\n" + sangria))
+                    f.write(",\n" if i < self.n - 1 else "\n")
+                f.write("]")
+        os.replace(tmp, path)
+        return path
+
+    def memoria(self):
+        """Bytes ocupados por los arrays de datos (aprox., sin contar las listas de categorías)."""
+        total = sum(c.datos.nbytes + (c.nulos.nbytes if c.nulos is not None else 0)
+                    + (c.entero.nbytes if c.entero is not None else 0) for c in self.columnas.values())
+        total += self.firma.nbytes
+        if self._ids is not None:
+            total += self._ids.nbytes + self._orden.nbytes
+        return total
@@ -1,11 +1,18 @@
 # === Recorre CSV + JSON y escribe el score difuso al JSON (rápido + feedback) ===
-import json
 import os
 import time
 
 import pandas as pd
 import numpy as np
 
+# Registros en columnas de NumPy (mismo uso que los dicts, una fracción de la memoria)
+from almacenRegistros import AlmacenRegistros
+# Resultados también en SQLite (upsert incremental; la API los sirve en /object/<object_id>)
+from resultados_db import ResultadosDB
+
+# Perfilado opcional: ASTROLAB_PERFIL=1 (o --perfil) imprime un resumen por etapas al terminar
+from perfilado import cronometrar, etapa
+
 # 1) Trae la función definir_variables
 try:
     from logicaDifusa import definir_variables as fuzzy_score  # si la tienes en un archivo
@@ -21,11 +28,13 @@ JSON_TMP  = JSON_OUT + ".tmp"   # guardado incremental
 N_SAVE = 500        # guarda cada N registros procesados
 PRINT_EVERY = 250   # imprime un mini-resumen cada N
 USE_TQDM = True     # intenta usar tqdm para progreso bonito
+USE_DB = True       # upsert de los scores en resultados.db en cada guardado
 # -------------------------------------------
 
 # 2) Carga CSV (llave = object_id)
 t0 = time.time()
-df = pd.read_csv(CSV_PATH, low_memory=False)
+with etapa("csv.carga"):
+    df = pd.read_csv(CSV_PATH, low_memory=False)
 if "object_id" not in df.columns:
     raise ValueError("El CSV no tiene columna 'object_id' (necesaria para el enlace).")
 
@@ -48,13 +57,14 @@ if dup_count:
           f"({len(uniq_dups)} IDs distintos). Ejemplos: {list(uniq_dups[:10])}")
 df_small = df_small[~df_small.index.duplicated(keep="first")]
 
-# Convertimos a dict para acceso rápido
-df_dict = df_small.to_dict(orient="index")
+# Almacén columnar con índice por object_id (df_dict.get(oid) como antes, sin un dict por fila)
+with etapa("csv.to_dict"):
+    df_dict = AlmacenRegistros.desde_dataframe(df_small)
 del df, df_small  # liberar memoria
 
 # 3) Carga JSON
-with open(JSON_IN, "r", encoding="utf-8") as f:
-    records = json.load(f)
+with etapa("json.carga"):
+    records = AlmacenRegistros.desde_json(JSON_IN)
 
 # 4) Mapeos
 MAP_CSV = {
@@ -84,6 +94,7 @@ def _to_float(x):
     except Exception:
         return None
 
+@cronometrar("pick_value")
 def pick_value(rowdict, rec, key, default):
     """Prefiere JSON > CSV > default."""
     json_col = MAP_JSON.get(key)
@@ -105,18 +116,9 @@ def pick_value(rowdict, rec, key, default):
 already = 0
 if os.path.exists(JSON_TMP):
     try:
-        with open(JSON_TMP, "r", encoding="utf-8") as f:
-            partial = json.load(f)
-        done_ids = {str(r.get("object_id")) for r in partial if r.get("earth_similarity", None) is not None}
-        id_to_partial = {str(r.get("object_id")): r for r in partial}
-        new_records = []
-        for rec in records:
-            oid = str(rec.get("object_id", ""))
-            if oid in id_to_partial:
-                new_records.append(id_to_partial[oid])
-            else:
-                new_records.append(rec)
-        records = new_records
+        partial = AlmacenRegistros.desde_json(JSON_TMP)
+        records.actualizar_desde(partial)
+        del partial
         already = len([r for r in records if r.get("earth_similarity", None) is not None])
         print(f"↩ Reanudando desde {JSON_TMP}. Registros ya puntuados: {already}")
     except Exception as e:
@@ -139,11 +141,21 @@ if USE_TQDM:
 
 def safe_fuzzy(entrada, oid):
     try:
-        score, _cats = fuzzy_score(entrada)
+        with etapa("difuso.total"):
+            score, _explicacion = fuzzy_score(entrada)   # explicación perezosa: sin coste si no se usa
         return float(round(score, 1)), None
     except Exception as e:
         return None, f"[WARN] Fallo al calcular fuzzy para {oid}: {e}"
 
+db = ResultadosDB() if USE_DB else None
+pendientes = []   # registros puntuados desde el último upsert
+
+def volcar_db():
+    if db is not None and pendientes:
+        with etapa("db.upsert"):
+            db.upsert((records[j] for j in pendientes), fuente="calcularSimilitud")
+        pendientes.clear()
+
 start = time.time()
 
 for i, rec in enumerate(records):
@@ -185,6 +197,7 @@ for i, rec in enumerate(records):
         print(err)
 
     procesados += 1
+    pendientes.append(i)
     if pbar: pbar.update(1)
 
     if not pbar and procesados - last_print >= PRINT_EVERY:
@@ -197,15 +210,17 @@ for i, rec in enumerate(records):
         last_print = procesados
 
     if procesados - last_save >= N_SAVE:
-        with open(JSON_TMP, "w", encoding="utf-8") as ftmp:
-            json.dump(records, ftmp, ensure_ascii=False, indent=2)
+        with etapa("json.checkpoint"):
+            records.volcar_json(JSON_TMP)
+        volcar_db()
         last_save = procesados
         if not pbar:
             print(f"💾 Guardado incremental: {already + procesados}/{total}")
 
 # 6) Guarda JSON final
-with open(JSON_OUT, "w", encoding="utf-8") as f:
-    json.dump(records, f, ensure_ascii=False, indent=2)
+with etapa("json.final"):
+    records.volcar_json(JSON_OUT)
+volcar_db()
 
 try:
     if os.path.exists(JSON_TMP):
@@ -0,0 +1,149 @@
+# === Genera teselas RA/DEC por niveles de zoom (quadtree) a partir del catálogo unificado ===
+# Cada tesela se limita a PRESUPUESTO puntos (se quedan los de mayor earth_similarity)
+# y se guarda como JSON columnar comprimido con gzip. Un manifest.json describe el árbol.
+import gzip
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+CSV_PATH    = "exoplanetas_unificado.csv"
+# earth_similarity: se usa el primer JSON puntuado que exista
+JSON_SCORES = ["exoplanetas_light_scored_imputed.json", "exoplanetas_light_scored.json"]
+OUT_DIR     = os.path.join("..", "astrolabia-local-web", "tiles")
+
+# --------- Parámetros ----------
+MAX_ZOOM    = 6      # nivel z tiene 2^z x 2^z teselas
+PRESUPUESTO = 256    # puntos máximos por tesela (el nivel MAX_ZOOM guarda todos)
+DECIMALES   = 4      # redondeo de floats para reducir tamaño
+# -------------------------------
+
+CAMPOS = [
+    "object_id", "RA", "DEC", "label", "mission",
+    "pl_radio", "pl_temperatura_eq", "periodo_orbital", "earth_similarity"
+]
+
+LABEL_MAP_FP = {"FALSE POSITIVE", "FP", "FA", "REFUTED", "REFUTED [PLANET]", "FALSE POSITIVE [CANDIDATE]"}
+LABEL_MAP_CONFIRMED = {"CONFIRMED", "CP", "KP", "KNOWN PLANET"}
+LABEL_MAP_CANDIDATE = {"CANDIDATE", "PC", "APC", "NOT DISPOSITIONED"}
+
+def normalize_label(label):
+    label = str(label).strip().upper()
+    if label in LABEL_MAP_FP:
+        return "FALSE POSITIVE"
+    elif label in LABEL_MAP_CONFIRMED:
+        return "CONFIRMED"
+    elif label in LABEL_MAP_CANDIDATE:
+        return "CANDIDATE"
+    else:
+        return "OTHER"
+
+
+def cargar_catalogo():
+    df = pd.read_csv(CSV_PATH, low_memory=False)
+    df["object_id"] = df["object_id"].astype(str)
+    df = df[~df["object_id"].duplicated(keep="first")]
+    df = df[df["RA"].notna() & df["DEC"].notna()].copy()
+    df["label"] = df["label"].map(normalize_label)
+
+    scores = {}
+    for path in JSON_SCORES:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                scores = {str(r.get("object_id")): r.get("earth_similarity") for r in json.load(f)}
+            print(f"earth_similarity desde {path}")
+            break
+    else:
+        print("[WARN] No hay JSON puntuado: las teselas se ordenarán sólo por radio.")
+    df["earth_similarity"] = pd.to_numeric(df["object_id"].map(scores), errors="coerce")
+
+    # Prioridad: mayor earth_similarity primero (NaN al final); desempate por radio y id
+    df = df.sort_values(
+        ["earth_similarity", "pl_radio", "object_id"],
+        ascending=[False, False, True], na_position="last", kind="mergesort"
+    )
+    return df[CAMPOS].reset_index(drop=True)
+
+
+def _columnar(tile):
+    """DataFrame → dict de listas (sin repetir claves por registro); NaN → null."""
+    out = {}
+    for col in CAMPOS:
+        serie = tile[col]
+        if serie.dtype.kind == "f":
+            vals = serie.round(DECIMALES).to_numpy()
+            out[col] = [None if np.isnan(v) else float(v) for v in vals]
+        else:
+            out[col] = serie.astype(str).tolist()
+    return out
+
+
+def generar_teselas(df, out_dir=OUT_DIR, max_zoom=MAX_ZOOM, presupuesto=PRESUPUESTO):
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+
+    ra = df["RA"].to_numpy(dtype=float) % 360.0
+    dec = np.clip(df["DEC"].to_numpy(dtype=float), -90.0, 90.0)
+
+    manifest = {
+        "version": 1,
+        "generado": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "total": int(len(df)),
+        "max_zoom": max_zoom,
+        "presupuesto": presupuesto,
+        "campos": CAMPOS,
+        "formato": "json-columnar+gzip",
+        "ruta": "{z}/{x}/{y}.json.gz",
+        "niveles": [],
+    }
+
+    for z in range(max_zoom + 1):
+        n = 2 ** z
+        tx = np.minimum((ra / 360.0 * n).astype(int), n - 1)
+        ty = np.minimum(((dec + 90.0) / 180.0 * n).astype(int), n - 1)
+        claves = pd.DataFrame({"tx": tx, "ty": ty})
+
+        # df ya viene ordenado por prioridad → head() conserva los mejores de cada tesela
+        grupos = claves.groupby(["tx", "ty"], sort=True)
+        idx = np.arange(len(df)) if z == max_zoom else grupos.head(presupuesto).index.to_numpy()
+        totales = grupos.size()
+
+        teselas = []
+        sel = df.iloc[idx]
+        for (x, y), tile in sel.groupby([tx[idx], ty[idx]], sort=True):
+            ruta = os.path.join(out_dir, str(z), str(x), f"{y}.json.gz")
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            with gzip.open(ruta, "wt", encoding="utf-8") as f:
+                json.dump(_columnar(tile), f, ensure_ascii=False, separators=(",", ":"))
+            teselas.append({
+                "x": int(x), "y": int(y),
+                "n": int(len(tile)),
+                "total": int(totales[(x, y)]),
+                "bytes": os.path.getsize(ruta),
+            })
+
+        manifest["niveles"].append({
+            "z": z,
+            "ra_paso": 360.0 / n,
+            "dec_paso": 180.0 / n,
+            "puntos": int(len(idx)),
+            "teselas": teselas,
+        })
+        print(f"z={z}: {len(teselas)} teselas, {len(idx)} puntos, "
+              f"{sum(t['bytes'] for t in teselas) / 1024:.1f} KiB")
+
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return manifest
+
+
+if __name__ == "__main__":
+    t0 = time.time()
+    df = cargar_catalogo()
+    generar_teselas(df)
+    print(f"Salida: {OUT_DIR}")
+    print(f"⏱ Tiempo total: {time.time() - t0:.1f} s")
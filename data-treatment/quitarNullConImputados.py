@@ -1,11 +1,18 @@
 # === Imputa CSV + recalcula earth_similarity nulo en JSON con lógica difusa (con progreso + guardado incremental) ===
-import json
 import os
 import time
 
 import pandas as pd
 import numpy as np
 
+# Registros en columnas de NumPy (mismo uso que los dicts, una fracción de la memoria)
+from almacenRegistros import AlmacenRegistros
+# Resultados también en SQLite (upsert incremental; la API los sirve en /object/<object_id>)
+from resultados_db import ResultadosDB
+
+# Perfilado opcional: ASTROLAB_PERFIL=1 (o --perfil) imprime un resumen por etapas al terminar
+from perfilado import cronometrar, etapa
+
 # 1) Importa la función de lógica difusa
 try:
     from logicaDifusa import definir_variables as fuzzy_score  # si está en un .py
@@ -20,6 +27,7 @@ JSON_TMP   = JSON_OUT + ".tmp"   # guardado incremental / reanudación
 
 # ---- Parámetros de ejecución ----
 USE_TQDM      = True   # intenta usar tqdm para una barra chula
+USE_DB        = True   # upsert de los scores en resultados.db en cada guardado
 PRINT_EVERY   = 500    # fallback: imprime mini-resumen cada N
 SAVE_EVERY    = 1000   # guarda incremental cada N procesados nuevos
 ROUND_SCORE_1D = True  # redondea el score a 1 decimal
@@ -28,7 +36,8 @@ ROUND_SCORE_1D = True  # redondea el score a 1 decimal
 t0 = time.time()
 
 # 2) Carga CSV y deja indexado por object_id
-df = pd.read_csv(CSV_PATH, low_memory=False)
+with etapa("csv.carga"):
+    df = pd.read_csv(CSV_PATH, low_memory=False)
 
 if "object_id" not in df.columns:
     raise ValueError("El CSV no tiene columna 'object_id' (necesaria para el enlace).")
@@ -64,13 +73,14 @@ for col in NEEDED:
 medianas = {col: df[col].median(skipna=True) for col in NEEDED}
 df[NEEDED] = df[NEEDED].fillna(value=medianas)
 
-# 5) Acceso rápido: pasa CSV imputado a dict {object_id: {col: val}}
-df_dict = df.to_dict(orient="index")
+# 5) Acceso rápido: CSV imputado en almacén columnar indexado por object_id (df_dict.get(oid))
+with etapa("csv.to_dict"):
+    df_dict = AlmacenRegistros.desde_dataframe(df)
 del df  # libera memoria
 
 # 6) Carga JSON
-with open(JSON_IN, "r", encoding="utf-8") as f:
-    records = json.load(f)
+with etapa("json.carga"):
+    records = AlmacenRegistros.desde_json(JSON_IN)
 
 # 7) Mapeos JSON/CSV → entradas del sistema difuso
 MAP_CSV = {
@@ -99,6 +109,7 @@ def _to_float(x):
     except Exception:
         return None
 
+@cronometrar("pick_value")
 def pick_value(rowdict, rec, key, default):
     """
     Prefiere JSON > CSV_imputado > default.
@@ -126,15 +137,10 @@ def pick_value(rowdict, rec, key, default):
 already = 0
 if os.path.exists(JSON_TMP):
     try:
-        with open(JSON_TMP, "r", encoding="utf-8") as f:
-            partial = json.load(f)
         # combinamos por object_id dando preferencia a lo ya guardado en tmp
-        by_id_tmp = {str(r.get("object_id")): r for r in partial}
-        new_records = []
-        for rec in records:
-            oid = str(rec.get("object_id", ""))
-            new_records.append(by_id_tmp.get(oid, rec))
-        records = new_records
+        partial = AlmacenRegistros.desde_json(JSON_TMP)
+        records.actualizar_desde(partial)
+        del partial
         already = sum(1 for r in records if r.get("earth_similarity") is not None)
         print(f"↩ Reanudando desde TMP. Ya calculados: {already}")
     except Exception as e:
@@ -159,11 +165,22 @@ faltantes_csv = []
 
 last_print = 0
 last_save = 0
+
+db = ResultadosDB() if USE_DB else None
+pendientes = []   # registros puntuados desde el último upsert
+
+def volcar_db():
+    if db is not None and pendientes:
+        with etapa("db.upsert"):
+            db.upsert((records[j] for j in pendientes), fuente="quitarNullConImputados")
+        pendientes.clear()
+
 start = time.time()
 
 def safe_fuzzy(entrada, oid):
     try:
-        score, _cats = fuzzy_score(entrada)
+        with etapa("difuso.total"):
+            score, _explicacion = fuzzy_score(entrada)   # explicación perezosa: sin coste si no se usa
         if ROUND_SCORE_1D:
             score = float(round(score, 1))
         else:
@@ -217,6 +234,7 @@ for idx, rec in enumerate(records):
     if err:
         print(err)
     procesados += 1
+    pendientes.append(idx)
 
     # Fallback de progreso si no hay tqdm: imprime cada PRINT_EVERY
     if not pbar and (idx + 1) - last_print >= PRINT_EVERY:
@@ -230,13 +248,15 @@ for idx, rec in enumerate(records):
 
     # Guardado incremental
     if procesados - last_save >= SAVE_EVERY:
-        with open(JSON_TMP, "w", encoding="utf-8") as ftmp:
-            json.dump(records, ftmp, ensure_ascii=False, indent=2)
+        with etapa("json.checkpoint"):
+            records.volcar_json(JSON_TMP)
+        volcar_db()
         last_save = procesados
 
 # 11) Guarda JSON final y limpia TMP
-with open(JSON_OUT, "w", encoding="utf-8") as f:
-    json.dump(records, f, ensure_ascii=False, indent=2)
+with etapa("json.final"):
+    records.volcar_json(JSON_OUT)
+volcar_db()
 
 try:
     if os.path.exists(JSON_TMP):
@@ -0,0 +1,228 @@
+# === Resultados precalculados (clasificador + earth_similarity) en SQLite ===
+#
+#   python resultados_db.py importar exoplanetas_light_scored_imputed.json
+#   python resultados_db.py clasificar          # probabilidades de model.pkl para el CSV (desde astrolabia-local-web)
+#
+# Misma copia en data-treatment/ y astrolabia-local-web/: los scripts de scoring hacen upsert
+# y la API consulta. Por defecto ambos usan astrolabia-local-web/resultados.db (o ASTROLAB_DB).
+# Las escrituras son transaccionales e incrementales (INSERT ... ON CONFLICT DO UPDATE) y sólo
+# tocan las claves presentes en cada registro: una clave ausente conserva lo que hubiera (así cada
+# etapa del pipeline rellena sólo sus columnas) y una clave presente con None la deja a NULL (un
+# re-scoring que ya no da valor no deja el antiguo).
+# Cada upsert es una transacción BEGIN IMMEDIATE que marca sus filas con `version` = máximo + 1:
+# como SQLite serializa a los escritores, las versiones se confirman en orden creciente y quien
+# sigue los cambios (cambios_desde) puede avanzar su marca sin perder filas de otra transacción.
+#
+# /object/<object_id> sirve estos resultados (predicción, earth_similarity, campos del JSON
+# puntuado); /catalogo/objeto/<object_id> sirve la fila del catálogo CSV con sus features.
+import functools
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+DB_PATH = os.environ.get("ASTROLAB_DB") or os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "astrolabia-local-web", "resultados.db"))
+
+# Columnas propias; el resto de campos del registro va en `extra` (JSON)
+COLUMNAS = ["object_id", "mission", "label", "prob_planeta", "prediccion", "earth_similarity", "RA", "DEC"]
+ORDENABLES = {"earth_similarity", "prob_planeta", "object_id", "RA", "DEC"}
+TAMANO_LOTE = 1000
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resultados (
+    object_id        TEXT PRIMARY KEY,
+    mission          TEXT,
+    label            TEXT,
+    prob_planeta     REAL,
+    prediccion       TEXT,
+    earth_similarity REAL,
+    RA               REAL,
+    DEC              REAL,
+    extra            TEXT NOT NULL DEFAULT '{}',
+    fuente           TEXT,
+    actualizado      TEXT,
+    version          INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_label_earth   ON resultados(label, earth_similarity);
+CREATE INDEX IF NOT EXISTS idx_mission_earth ON resultados(mission, earth_similarity);
+CREATE INDEX IF NOT EXISTS idx_earth         ON resultados(earth_similarity);
+CREATE INDEX IF NOT EXISTS idx_prob          ON resultados(prob_planeta);
+"""
+# Aparte: en una resultados.db anterior la columna `version` se añade antes de indexarla
+INDICE_VERSION = "CREATE INDEX IF NOT EXISTS idx_version ON resultados(version)"
+
+@functools.lru_cache(maxsize=None)
+def _upsert_sql(columnas):
+    """
+    UPSERT que sólo actualiza `columnas` (las presentes en el registro, object_id la primera).
+    El parche de `extra` va dos veces: al insertar sin nulls y al actualizar tal cual, para que
+    json_patch borre las claves a None (excluded.extra ya vendría sin ellas).
+    """
+    asignaciones = [f"{c} = excluded.{c}" for c in columnas[1:]]
+    return f"""
+INSERT INTO resultados ({", ".join(columnas)}, extra, fuente, actualizado, version)
+VALUES ({", ".join("?" * len(columnas))}, json_patch('{{}}', ?), ?, ?, ?)
+ON CONFLICT(object_id) DO UPDATE SET
+    {"".join(a + ", " for a in asignaciones)}extra = json_patch(resultados.extra, ?),
+    fuente = excluded.fuente,
+    actualizado = excluded.actualizado,
+    version = excluded.version
+"""
+
+
+def _limpio(v):
+    """NaN → None (SQLite no tiene NaN y json.dumps lo escribiría como literal inválido)."""
+    return None if isinstance(v, float) and v != v else v
+
+
+def _fila(registro):
+    """Registro → (columnas presentes, valores, parche de extra). En `extra`, un None borra la clave (json_patch)."""
+    rec = registro if isinstance(registro, dict) else registro.a_dict()
+    oid = rec.get("object_id")
+    if oid is None or str(oid) == "":
+        raise ValueError("Registro sin object_id")
+    columnas = ("object_id",) + tuple(c for c in COLUMNAS[1:] if c in rec)
+    extra = {k: _limpio(v) for k, v in rec.items() if k not in COLUMNAS}
+    valores = [str(oid)] + [_limpio(rec[c]) for c in columnas[1:]]
+    return columnas, valores, json.dumps(extra, ensure_ascii=False)
+
+
+class ResultadosDB:
+    """Acceso a resultados.db; una conexión por hilo (sqlite3 no comparte conexiones entre hilos)."""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self.conexion() as con:
+            con.executescript(ESQUEMA)
+            if "version" not in {r["name"] for r in con.execute("PRAGMA table_info(resultados)")}:
+                con.execute("ALTER TABLE resultados ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+                con.execute("DROP INDEX IF EXISTS idx_actualizado")
+            con.execute(INDICE_VERSION)
+
+    def conexion(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=30)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")      # lectores no bloquean al escritor
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    # ---------- escritura ----------
+    def upsert(self, registros, fuente=None):
+        """Inserta/actualiza registros (dicts o Registro de almacenRegistros) en una transacción."""
+        ahora = time.strftime("%Y-%m-%dT%H:%M:%S")
+        filas = [_fila(r) for r in registros]
+        con = self.conexion()
+        with con:
+            # la versión se lee con el cerrojo de escritura ya tomado (ver cabecera)
+            con.execute("BEGIN IMMEDIATE")
+            version = con.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM resultados").fetchone()[0]
+            # tramos consecutivos con las mismas columnas: se respeta el orden de los registros
+            for columnas, tramo in itertools.groupby(filas, key=lambda f: f[0]):
+                tramo = [valores + [parche, fuente, ahora, version, parche] for _, valores, parche in tramo]
+                for i in range(0, len(tramo), TAMANO_LOTE):
+                    con.executemany(_upsert_sql(columnas), tramo[i:i + TAMANO_LOTE])
+        return len(filas)
+
+    def importar_json(self, path, fuente=None):
+        with open(path, "r", encoding="utf-8") as f:
+            registros = [r for r in json.load(f) if r.get("object_id")]
+        return self.upsert(registros, fuente or os.path.basename(path))
+
+    # ---------- lectura ----------
+    @staticmethod
+    def _a_dict(row):
+        rec = {c: row[c] for c in COLUMNAS}
+        rec.update(json.loads(row["extra"]))
+        rec["fuente"] = row["fuente"]
+        rec["actualizado"] = row["actualizado"]
+        return rec
+
+    def obtener(self, object_id):
+        row = self.conexion().execute(
+            "SELECT * FROM resultados WHERE object_id = ?", (str(object_id),)).fetchone()
+        return None if row is None else self._a_dict(row)
+
+    def listar(self, label=None, mission=None, earth_min=None, earth_max=None, prob_min=None,
+               orden="earth_similarity", descendente=True, limite=50, desplazamiento=0):
+        """Filtros opcionales (label/mission aceptan lista) → (total, lista de registros)."""
+        if orden not in ORDENABLES:
+            raise ValueError(f"orden debe ser uno de {sorted(ORDENABLES)}")
+        limite = int(limite)
+        desplazamiento = int(desplazamiento)
+        if not 1 <= limite <= 1000 or desplazamiento < 0:
+            raise ValueError("limite debe estar entre 1 y 1000 y desplazamiento ser >= 0")
+
+        condiciones, params = [], []
+        for col, valor in (("label", label), ("mission", mission)):
+            if valor:
+                valores = [valor] if isinstance(valor, str) else list(valor)
+                condiciones.append(f"{col} IN ({', '.join('?' * len(valores))})")
+                params += valores
+        for col, op, valor in (("earth_similarity", ">=", earth_min), ("earth_similarity", "<=", earth_max),
+                               ("prob_planeta", ">=", prob_min)):
+            if valor is not None:
+                condiciones.append(f"{col} {op} ?")
+                params.append(float(valor))
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+        con = self.conexion()
+        total = con.execute(f"SELECT COUNT(*) FROM resultados {where}", params).fetchone()[0]
+        # NULLs siempre al final, también en orden descendente
+        rows = con.execute(
+            f"SELECT * FROM resultados {where} ORDER BY {orden} IS NULL, {orden} "
+            f"{'DESC' if descendente else 'ASC'}, object_id LIMIT ? OFFSET ?",
+            params + [limite, desplazamiento]).fetchall()
+        return total, [self._a_dict(r) for r in rows]
+
+    def cambios_desde(self, marca=None):
+        """
+        Filas escritas por transacciones posteriores a `marca` (todas si es None) → (filas, nueva
+        marca). La marca es la `version` más alta vista; las versiones se confirman en orden, así
+        que ninguna transacción posterior puede traer una versión menor o igual.
+        """
+        con = self.conexion()
+        filas = con.execute("SELECT * FROM resultados WHERE version > ? ORDER BY version",
+                            (-1 if marca is None else marca,)).fetchall()
+        return filas, (filas[-1]["version"] if filas else marca)
+
+    def __len__(self):
+        return self.conexion().execute("SELECT COUNT(*) FROM resultados").fetchone()[0]
+
+
+def clasificar(db, model, df, features, clases=("FALSE POSITIVE", "PLANET")):
+    """Probabilidad de PLANET para cada fila de df (columnas `features`) → upsert. Devuelve filas escritas."""
+    df = df.drop_duplicates("object_id")
+    proba = model.predict_proba(df[features].to_numpy(dtype=float))[:, 1]
+    registros = [
+        {"object_id": str(oid), "mission": mission, "label": label, "RA": ra, "DEC": dec,
+         "prob_planeta": float(p), "prediccion": clases[int(p >= 0.5)]}
+        for oid, mission, label, ra, dec, p in zip(df["object_id"], df["mission"], df["label"],
+                                                  df["RA"], df["DEC"], proba)
+    ]
+    return db.upsert(registros, fuente="clasificador")
+
+
+if __name__ == "__main__":
+    accion = sys.argv[1] if len(sys.argv) > 1 else ""
+    t0 = time.time()
+    db = ResultadosDB()
+    if accion == "importar" and len(sys.argv) > 2:
+        n = sum(db.importar_json(p) for p in sys.argv[2:])
+    elif accion == "clasificar":
+        import joblib
+        from catalogo import FEATURES, cargar_catalogo   # sólo disponible en astrolabia-local-web
+
+        n = clasificar(db, joblib.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), "model.pkl")),
+                       cargar_catalogo(), FEATURES)
+    else:
+        raise SystemExit("Uso: python resultados_db.py importar <json>... | clasificar")
+    print(f"✔ {n} registros escritos en {db.path} ({len(db)} en total)")
+    print(f"⏱ Tiempo total: {time.time() - t0:.1f} s")
@@ -0,0 +1,218 @@
+# === Actualización incremental del clasificador (más árboles sobre el booster existente) ===
+#
+#   python actualizar.py                                # base = artefactos/ultima.json
+#   python actualizar.py --base v20250101-120000 --arboles 80
+#   python actualizar.py --base ../astrolabia-local-web/model.pkl --csv-anterior viejo.csv
+#   python actualizar.py --simular                      # evalúa y compara, pero no publica
+#
+# En vez de reentrenar desde cero, se cargan los árboles del modelo base y se añaden `--arboles`
+# más entrenados sobre las filas nuevas o reetiquetadas (más un repaso de filas antiguas para que
+# el modelo no "olvide"). Qué es nuevo se decide comparando pares (object_id, etiqueta) con los del
+# entrenamiento de la base: entrenamiento.npz de su versión o, si no lo tiene (p.ej. el model.pkl
+# de la web), el CSV con el que se entrenó (--csv-anterior).
+#
+# Validación: holdout fijo por hash de object_id (HOLDOUT_PCT %, el mismo que usa entrenar.py
+# como test), igual en todas las actualizaciones aunque el CSV crezca; sus filas nunca entran al
+# entrenamiento. Se compara con un reentrenamiento completo (parámetros fijos) sobre las mismas
+# filas y con la base, y sólo se publica una versión nueva si el macro F1 no cae más de
+# --tolerancia frente a ellos. Si la base vio filas del holdout (p.ej. el model.pkl de la web,
+# entrenado con un split aleatorio) el modelo incremental hereda ese sesgo y la comparación no
+# vale: se aborta sin evaluar y hay que partir de una versión de entrenar.py.
+import argparse
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from entrenar import (ARTEFACTOS, BASE_DIR, CSV_PATH, HOLDOUT_PCT, PARAMS_BINARIA, PARAMS_MULTICLASE,
+                      en_holdout, entrenar_fijo, evaluar, guardar_version, preparar_datos)
+
+MODELO_WEB  = os.path.join(BASE_DIR, "..", "astrolabia-local-web", "model.pkl")
+ARBOLES     = 60      # árboles añadidos por actualización
+TASA        = 0.02    # learning rate de los árboles añadidos (menor que la del entrenamiento completo)
+REPASO      = 1.0     # filas antiguas repasadas por cada fila nueva
+TOLERANCIA  = 0.005   # caída máxima de macro F1 admitida frente a base y reentrenamiento completo
+
+
+def cargar_base(base=None, destino=ARTEFACTOS):
+    """
+    `base` = nombre de versión en artefactos/, ruta a un model.pkl o None (la de ultima.json y,
+    si no hay versiones, el model.pkl de la web) → dict con model, version, carpeta y metricas.
+    """
+    if base is None:
+        ultima = os.path.join(destino, "ultima.json")
+        if os.path.exists(ultima):
+            with open(ultima, "r", encoding="utf-8") as f:
+                base = json.load(f)["version"]
+        else:
+            base = MODELO_WEB
+    carpeta = os.path.join(destino, base)
+    model_path = os.path.join(carpeta, "model.pkl") if os.path.isdir(carpeta) else base
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"No existe la versión ni el modelo base: {base}")
+
+    carpeta = os.path.dirname(os.path.abspath(model_path))
+    metricas = None
+    if os.path.exists(os.path.join(carpeta, "metricas.json")):
+        with open(os.path.join(carpeta, "metricas.json"), "r", encoding="utf-8") as f:
+            metricas = json.load(f)
+    return {
+        "model": joblib.load(model_path),
+        "version": (metricas or {}).get("version") or os.path.relpath(model_path, BASE_DIR),
+        "carpeta": carpeta,
+        "metricas": metricas,
+    }
+
+
+def entrenamiento_previo(base, csv_anterior=None, clases="binaria"):
+    """(object_id, y) con los que se entrenó la base: entrenamiento.npz o el CSV anterior."""
+    path = os.path.join(base["carpeta"], "entrenamiento.npz")
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as z:
+            return z["object_id"], z["y"]
+    if csv_anterior:
+        datos = preparar_datos(csv_anterior, clases)
+        return datos["object_id"], datos["y"]
+    raise SystemExit(f"La base {base['version']} no tiene entrenamiento.npz: indica --csv-anterior "
+                     "con el CSV con el que se entrenó")
+
+
+def filas_nuevas(object_ids, y, ids_previos, y_previos):
+    """Máscaras (nuevas, reetiquetadas): par (object_id, y) que no estaba en el entrenamiento previo."""
+    pares = set(zip(ids_previos.tolist(), y_previos.tolist()))
+    vistos = set(ids_previos.tolist())
+    nuevas = np.array([(o, c) not in pares for o, c in zip(object_ids.tolist(), y.tolist())], dtype=bool)
+    reetiquetadas = nuevas & np.array([o in vistos for o in object_ids.tolist()], dtype=bool)
+    return nuevas, reetiquetadas
+
+
+def continuar(base_model, X, y, clases, arboles, n_jobs, learning_rate=TASA):
+    """Añade `arboles` árboles al booster de base_model entrenados sobre (X, y) → XGBClassifier nuevo."""
+    import xgboost as xgb
+
+    params = dict(PARAMS_BINARIA if clases == "binaria" else PARAMS_MULTICLASE,
+                  n_estimators=arboles, learning_rate=learning_rate)
+    model = xgb.XGBClassifier(n_jobs=n_jobs, **params)
+    model.fit(X, y, xgb_model=base_model.get_booster())
+    return model, params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Actualiza el clasificador añadiendo árboles con las filas nuevas.")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--base", default=None, help="versión de artefactos/ o ruta a model.pkl")
+    parser.add_argument("--csv-anterior", default=None,
+                        help="CSV con el que se entrenó la base (si no tiene entrenamiento.npz)")
+    parser.add_argument("--clases", choices=["binaria", "multiclase"], default="binaria")
+    parser.add_argument("--arboles", type=int, default=ARBOLES)
+    parser.add_argument("--learning-rate", type=float, default=TASA)
+    parser.add_argument("--repaso", type=float, default=REPASO)
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    parser.add_argument("--holdout-pct", type=int, default=HOLDOUT_PCT)
+    parser.add_argument("--sin-completo", action="store_true",
+                        help="no reentrena desde cero para comparar (sólo contra la base)")
+    parser.add_argument("--simular", action="store_true", help="compara pero no publica")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    t0 = time.time()
+    base = cargar_base(args.base)
+    datos = preparar_datos(args.csv, args.clases)
+    n_clases = len(datos["class_names"])
+    if getattr(base["model"], "n_classes_", n_clases) != n_clases:
+        raise SystemExit(f"La base tiene {base['model'].n_classes_} clases y los datos {n_clases}")
+    print(f"Base: {base['version']} | datos {datos['X'].shape}")
+
+    X = pd.DataFrame(datos["X"], columns=datos["features"])
+    y = datos["y"]
+    holdout = en_holdout(datos["object_id"], args.holdout_pct)
+    ids_previos, y_previos = entrenamiento_previo(base, args.csv_anterior, args.clases)
+    vistos = np.isin(ids_previos, datos["object_id"][holdout])
+    if vistos.any():
+        raise SystemExit(f"La base {base['version']} se entrenó con {int(vistos.sum())} filas del holdout: "
+                         "sus árboles ya las conocen y la comparación saldría optimista. Parte de una "
+                         f"versión de entrenar.py con el mismo --holdout-pct ({args.holdout_pct})")
+    nuevas, reetiquetadas = filas_nuevas(datos["object_id"], y, ids_previos, y_previos)
+    nuevas &= ~holdout
+    reetiquetadas &= ~holdout
+    print(f"Holdout: {holdout.sum()} filas | nuevas: {nuevas.sum()} (reetiquetadas: {reetiquetadas.sum()})")
+    if not nuevas.any():
+        print("Nada que actualizar: no hay filas nuevas ni reetiquetadas fuera del holdout")
+        return 0
+
+    # Conjunto de la actualización: filas nuevas + repaso aleatorio de las antiguas
+    rng = np.random.default_rng(args.seed)
+    antiguas = np.flatnonzero(~holdout & ~nuevas)
+    n_repaso = min(len(antiguas), int(args.repaso * nuevas.sum()))
+    idx = np.concatenate([np.flatnonzero(nuevas), rng.choice(antiguas, n_repaso, replace=False)])
+    if len(np.unique(y[idx])) < n_clases:
+        raise SystemExit("Las filas de la actualización no cubren todas las clases: sube --repaso")
+
+    X_hold, y_hold = X[holdout], y[holdout]
+    t1 = time.time()
+    model, params = continuar(base["model"], X.iloc[idx], y[idx], args.clases, args.arboles,
+                              args.n_jobs, args.learning_rate)
+    t_incremental = time.time() - t1
+
+    comparacion = {}
+    evaluacion, reporte_txt = evaluar(model, X_hold, y_hold, datos["class_names"])
+    comparacion["incremental"] = evaluacion["macro_f1"]
+    comparacion["base"] = evaluar(base["model"], X_hold, y_hold, datos["class_names"])[0]["macro_f1"]
+    t_completo = None
+    if not args.sin_completo:
+        t1 = time.time()
+        completo, _ = entrenar_fijo(X[~holdout], y[~holdout], args.clases, args.n_jobs)
+        t_completo = time.time() - t1
+        comparacion["completo"] = evaluar(completo, X_hold, y_hold, datos["class_names"])[0]["macro_f1"]
+    print(reporte_txt)
+    referencias = [n for n in comparacion if n != "incremental"]
+    for nombre, f1 in comparacion.items():
+        print(f"macro F1 {nombre:<12} {f1:.4f}")
+
+    minimo = max(comparacion[n] for n in referencias) - args.tolerancia
+    aceptado = comparacion["incremental"] >= minimo
+    print(f"Entrenamiento: incremental {t_incremental:.1f} s"
+          + (f" | completo {t_completo:.1f} s" if t_completo is not None else ""))
+    if not aceptado:
+        print(f"✘ No se publica: macro F1 {comparacion['incremental']:.4f} < {minimo:.4f}")
+        return 1
+    if args.simular:
+        print("✔ Calidad aceptable (simulación: no se publica)")
+        return 0
+
+    metricas = {
+        "generado": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "tipo": "incremental",
+        "base": base["version"],
+        "csv_sha1": datos["csv_hash"],
+        "clases": args.clases,
+        "class_names": datos["class_names"],
+        "features": datos["features"],
+        "n_train": int(len(idx)),
+        "n_test": int(holdout.sum()),
+        "filas": {"nuevas": int(nuevas.sum()), "reetiquetadas": int(reetiquetadas.sum()), "repaso": n_repaso},
+        "holdout": {"criterio": "sha1(object_id) % 100", "pct": args.holdout_pct},
+        "busqueda": {"estimador": "xgboost", "config": params,
+                     "arboles_totales": int(model.get_booster().num_boosted_rounds())},
+        "comparacion_macro_f1": comparacion,
+        "referencias": referencias,
+        "tolerancia": args.tolerancia,
+        "tiempos_s": {"incremental": round(t_incremental, 2),
+                      "completo": None if t_completo is None else round(t_completo, 2)},
+        "evaluacion": evaluacion,
+    }
+    entrenamiento = (np.concatenate([ids_previos, datos["object_id"][nuevas]]),
+                     np.concatenate([y_previos, y[nuevas]]))
+    carpeta = guardar_version(model, metricas, reporte_txt, entrenamiento=entrenamiento)
+    print(f"✔ Versión incremental guardada en {carpeta}")
+    print(f"⏱ Tiempo total: {time.time() - t0:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
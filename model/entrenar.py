@@ -0,0 +1,272 @@
+# === Pipeline de entrenamiento por línea de comandos (sustituye a las celdas de creacion_modelo.ipynb) ===
+#
+#   python entrenar.py                          # búsqueda FLAML (xgboost) con 600 s y todos los núcleos
+#   python entrenar.py --tiempo 120 --clases multiclase
+#   python entrenar.py --sin-busqueda           # parámetros fijos del notebook, sin AutoML
+#
+# La matriz limpia (etiquetas normalizadas, sin RA/DEC/ids) se cachea en .cache/ en formato
+# .npz y se reutiliza mientras no cambie el CSV. Cada ejecución escribe una versión en
+# artefactos/<version>/ con model.pkl, metricas.json, reporte.txt y entrenamiento.npz
+# (object_id + etiqueta de las filas de entrenamiento; actualizar.py lo usa para saber qué es nuevo).
+#
+# El test es un holdout fijo por hash de object_id (HOLDOUT_PCT %), no un split aleatorio: es el
+# mismo que usa actualizar.py para validar, así que ninguna versión ha visto esas filas.
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import classification_report, confusion_matrix, f1_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH      = os.path.join(BASE_DIR, "..", "data-treatment", "exoplanetas_unificado.csv")
+CACHE_DIR     = os.path.join(BASE_DIR, ".cache")
+ARTEFACTOS    = os.path.join(BASE_DIR, "artefactos")
+CACHE_VERSION = 1   # súbelo si cambia la limpieza para invalidar la caché
+VALIDACION    = 0.2   # fracción del entrenamiento reservada para que FLAML elija modelo
+HOLDOUT_PCT   = 20    # % de object_id reservados para test (fijo: depende sólo del id)
+
+# Columnas que nunca entran al modelo (coordenadas, ids y la propia etiqueta)
+COLUMNAS_EXCLUIDAS = ["RA", "DEC", "label", "mission", "object_id"]
+
+# Parámetros del notebook (mejor configuración encontrada por FLAML)
+PARAMS_BINARIA = {
+    'n_estimators': 228,
+    'max_leaves': 143,
+    'min_child_weight': 0.5296177148580371,
+    'learning_rate': 0.07186279434453446,
+    'subsample': 0.9911870640734798,
+    'colsample_bylevel': 0.8415892418572928,
+    'colsample_bytree': 1.0,
+    'reg_alpha': 0.018870980731499835,
+    'reg_lambda': 0.8602626316154423,
+    'objective': 'binary:logistic',
+    'eval_metric': 'logloss'
+}
+PARAMS_MULTICLASE = {
+    'n_estimators': 1080,
+    'max_leaves': 45,
+    'min_child_weight': 0.18534714676420808,
+    'learning_rate': 0.07207682269307049,
+    'subsample': 0.922847602771779,
+    'colsample_bylevel': 1.0,
+    'colsample_bytree': 1.0,
+    'reg_alpha': 0.0014249188153002787,
+    'reg_lambda': 0.2021107529299507
+}
+
+def en_holdout(object_ids, pct=HOLDOUT_PCT):
+    """Máscara del holdout fijo: sha1(object_id) módulo 100 < pct."""
+    return np.array([int(hashlib.sha1(str(o).encode("utf-8")).hexdigest()[:8], 16) % 100 < pct
+                     for o in object_ids], dtype=bool)
+
+
+# ========= Normalizar etiquetas =========
+LABEL_MAP_FP = {"FALSE POSITIVE", "FP", "FA", "REFUTED", "REFUTED [PLANET]", "FALSE POSITIVE [CANDIDATE]"}
+LABEL_MAP_CONFIRMED = {"CONFIRMED", "CP", "KP", "KNOWN PLANET"}
+LABEL_MAP_CANDIDATE = {"CANDIDATE", "PC", "APC", "NOT DISPOSITIONED"}
+
+
+def normalize_label(label, clases="binaria"):
+    if label in LABEL_MAP_FP:
+        return "FALSE POSITIVE"
+    elif label in LABEL_MAP_CONFIRMED:
+        return "PLANET" if clases == "binaria" else "CONFIRMED"
+    elif label in LABEL_MAP_CANDIDATE:
+        return "PLANET" if clases == "binaria" else "CANDIDATE"
+    else:
+        return "OTHER"
+
+
+def _hash_archivo(path, bloque=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(bloque), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def preparar_datos(csv_path=CSV_PATH, clases="binaria", cache_dir=CACHE_DIR, usar_cache=True):
+    """
+    Devuelve dict con X (float32), y (int), features, class_names, object_id y hash del CSV.
+    Se lee de .cache/ si ya existe la misma combinación (CSV, clases, CACHE_VERSION).
+    """
+    csv_hash = _hash_archivo(csv_path)
+    cache_path = os.path.join(cache_dir, f"datos_{clases}_v{CACHE_VERSION}_{csv_hash[:12]}.npz")
+
+    if usar_cache and os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as z:
+            datos = {k: z[k] for k in z.files}
+        datos["features"] = datos["features"].tolist()
+        datos["class_names"] = datos["class_names"].tolist()
+        datos["csv_hash"] = csv_hash
+        datos["cache"] = cache_path
+        return datos
+
+    df = pd.read_csv(csv_path, low_memory=False)
+    y = df["label"].astype(str).apply(lambda l: normalize_label(l, clases))
+    mask = y != "OTHER"
+    df, y = df[mask], y[mask]
+
+    X = df.drop(columns=[c for c in COLUMNAS_EXCLUIDAS if c in df.columns])
+    X = X.select_dtypes(include=[np.number])
+
+    class_names = sorted(y.unique())   # mismo orden que LabelEncoder
+    y_encoded = y.map({c: i for i, c in enumerate(class_names)}).to_numpy(dtype=np.int32)
+
+    datos = {
+        "X": X.to_numpy(dtype=np.float32),
+        "y": y_encoded,
+        "features": list(X.columns),
+        "class_names": class_names,
+        "object_id": np.array(df["object_id"].astype(str).tolist()),
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(cache_path, **{k: np.asarray(v) for k, v in datos.items()})
+    datos["csv_hash"] = csv_hash
+    datos["cache"] = None
+    return datos
+
+
+def buscar_modelo(X_train, y_train, X_val, y_val, tiempo, n_jobs, estimadores, seed=42):
+    """FLAML AutoML con presupuesto de tiempo; cada estimador usa todos los núcleos (n_jobs)."""
+    from flaml import AutoML
+
+    automl = AutoML()
+    automl.fit(
+        X_train=X_train, y_train=y_train,
+        X_val=X_val, y_val=y_val,
+        task="classification",
+        metric="macro_f1",
+        estimator_list=estimadores,
+        time_budget=tiempo,
+        n_jobs=n_jobs,
+        seed=seed,
+        verbose=1,
+        log_file_name=os.path.join(CACHE_DIR, "automl.log"),
+    )
+    return automl.model.estimator, {"estimador": automl.best_estimator, "config": automl.best_config}
+
+
+def entrenar_fijo(X_train, y_train, clases, n_jobs):
+    import xgboost as xgb
+
+    params = dict(PARAMS_BINARIA if clases == "binaria" else PARAMS_MULTICLASE)
+    model = xgb.XGBClassifier(n_jobs=n_jobs, **params)
+    model.fit(X_train, y_train)
+    return model, {"estimador": "xgboost", "config": params}
+
+
+def evaluar(model, X_test, y_test, class_names):
+    y_pred = np.asarray(model.predict(X_test))
+    proba = model.predict_proba(X_test)
+    if len(class_names) == 2:
+        auc = roc_auc_score(y_test, proba[:, 1])
+    else:
+        auc = roc_auc_score(y_test, proba, multi_class="ovr")
+    reporte_txt = classification_report(y_test, y_pred, target_names=class_names, digits=3)
+    return {
+        "macro_f1": float(f1_score(y_test, y_pred, average="macro")),
+        "accuracy": float((y_pred == y_test).mean()),
+        "roc_auc": float(auc),
+        "matriz_confusion": confusion_matrix(y_test, y_pred).tolist(),
+        "reporte": classification_report(y_test, y_pred, target_names=class_names, output_dict=True),
+    }, reporte_txt
+
+
+def guardar_version(model, metricas, reporte_txt, destino=ARTEFACTOS, version=None, entrenamiento=None):
+    """
+    Escribe artefactos/<version>/{model.pkl, metricas.json, reporte.txt} y actualiza ultima.json.
+    `entrenamiento` = (object_id, y) de las filas con las que se entrenó → entrenamiento.npz.
+    """
+    version = version or time.strftime("v%Y%m%d-%H%M%S")
+    carpeta = os.path.join(destino, version)
+    os.makedirs(carpeta, exist_ok=False)
+
+    # El modelo se guarda "desnudo" (XGBClassifier), igual que astrolabia-local-web/model.pkl
+    joblib.dump(model, os.path.join(carpeta, "model.pkl"))
+    metricas = dict(metricas, version=version)
+    with open(os.path.join(carpeta, "metricas.json"), "w", encoding="utf-8") as f:
+        json.dump(metricas, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(carpeta, "reporte.txt"), "w", encoding="utf-8") as f:
+        f.write("===== Reporte de Clasificación =====\n")
+        f.write(f"Versión: {version}\n\n")
+        f.write(reporte_txt)
+    if entrenamiento is not None:
+        ids, y = entrenamiento
+        np.savez(os.path.join(carpeta, "entrenamiento.npz"), object_id=np.asarray(ids), y=np.asarray(y))
+    with open(os.path.join(destino, "ultima.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": version, "macro_f1": metricas["evaluacion"]["macro_f1"]}, f, indent=2)
+    return carpeta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entrena el clasificador de exoplanetas.")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--clases", choices=["binaria", "multiclase"], default="binaria")
+    parser.add_argument("--tiempo", type=int, default=600, help="presupuesto de búsqueda en segundos")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="núcleos (-1 = todos)")
+    parser.add_argument("--estimadores", default="xgboost",
+                        help="lista FLAML separada por comas (p.ej. xgboost,lgbm,rf)")
+    parser.add_argument("--sin-busqueda", action="store_true", help="usa los parámetros fijos del notebook")
+    parser.add_argument("--sin-cache", action="store_true")
+    parser.add_argument("--holdout-pct", type=int, default=HOLDOUT_PCT)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    t0 = time.time()
+    datos = preparar_datos(args.csv, args.clases, usar_cache=not args.sin_cache)
+    t_datos = time.time() - t0
+    print(f"Datos: {datos['X'].shape} ({'caché' if datos['cache'] else 'CSV'}) en {t_datos:.1f} s")
+
+    X = pd.DataFrame(datos["X"], columns=datos["features"])
+    y = datos["y"]
+    holdout = en_holdout(datos["object_id"], args.holdout_pct)
+    X_train, X_test, y_train, y_test = X[~holdout], X[holdout], y[~holdout], y[holdout]
+    ids_train = datos["object_id"][~holdout]
+
+    t1 = time.time()
+    if args.sin_busqueda:
+        model, busqueda = entrenar_fijo(X_train, y_train, args.clases, args.n_jobs)
+    else:
+        # FLAML elige modelo e hiperparámetros con una validación sacada del entrenamiento;
+        # el test sólo se usa para las métricas finales (si no, salen optimistas)
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X_train, y_train, test_size=VALIDACION, random_state=args.seed, stratify=y_train
+        )
+        model, busqueda = buscar_modelo(
+            X_fit, y_fit, X_val, y_val, args.tiempo, args.n_jobs,
+            [e.strip() for e in args.estimadores.split(",") if e.strip()], seed=args.seed,
+        )
+        busqueda["n_validacion"] = int(len(y_val))
+    t_entreno = time.time() - t1
+
+    evaluacion, reporte_txt = evaluar(model, X_test, y_test, datos["class_names"])
+    print(reporte_txt)
+
+    metricas = {
+        "generado": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "csv_sha1": datos["csv_hash"],
+        "clases": args.clases,
+        "class_names": datos["class_names"],
+        "features": datos["features"],
+        "n_train": int(len(y_train)),
+        "n_test": int(len(y_test)),
+        "holdout": {"criterio": "sha1(object_id) % 100", "pct": args.holdout_pct},
+        "busqueda": busqueda,
+        "tiempos_s": {"datos": round(t_datos, 2), "entrenamiento": round(t_entreno, 2)},
+        "evaluacion": evaluacion,
+    }
+    carpeta = guardar_version(model, metricas, reporte_txt, entrenamiento=(ids_train, y_train))
+    print(f"✔ Modelo guardado en {carpeta}")
+    print(f"⏱ Tiempo total: {time.time() - t0:.1f} s")
+    return carpeta
+
+
+if __name__ == "__main__":
+    main()